@@ -22,8 +22,28 @@ const float measurementIntervalSec = 0.1; // 100 ms
 
 // ==== TIEMPOS ====
 unsigned long measurementStartTime = 0;
+uint32_t measurementStartUs = 0;  // origen de los timestamps de las tramas binarias
 unsigned long measurementDuration = 10000; // en milisegundos
 
+// ==== TRAMAS BINARIAS ====
+// Se activa con {"action": "start_measurement", "format": "binary"}; si no, se envía JSON por muestra.
+// Cabecera: 'A' 'R' | versión | canales | muestras (u16) | secuencia (u32)
+// Muestra:  µs desde el inicio de la medición (u32, da la vuelta a los ~71.6 min) | dos lecturas de 12 bits empaquetadas en 3 bytes
+const uint8_t FRAME_VERSION = 1;
+const int FRAME_HEADER_SIZE = 10;
+const int FRAME_SAMPLE_SIZE = 7;
+const int SAMPLES_PER_FRAME = 20;
+const uint32_t FRAME_MAX_AGE_US = 50000;  // una trama sale llena o a los 50 ms de su primera muestra
+bool binaryMode = false;
+// El ticker solo agrega muestras; las tramas se envían desde loop(). frameMux protege
+// frameBuffer/frameCount entre la tarea del ticker y la del loop.
+uint8_t frameBuffer[FRAME_HEADER_SIZE + SAMPLES_PER_FRAME * FRAME_SAMPLE_SIZE];
+uint8_t sendBuffer[FRAME_HEADER_SIZE + SAMPLES_PER_FRAME * FRAME_SAMPLE_SIZE];
+volatile uint16_t frameCount = 0;
+volatile uint32_t frameStartUs = 0;  // micros() de la primera muestra de la trama en curso
+uint32_t frameSeq = 0;
+portMUX_TYPE frameMux = portMUX_INITIALIZER_UNLOCKED;
+
 // ==== PROTOTIPOS ====
 void setupWiFi();
 void setupWebSocket();
@@ -32,6 +52,9 @@ void webSocketEvent(uint8_t, WStype_t, uint8_t*, size_t);
 void startMeasurement(int durationSeconds);
 void stopMeasurement();
 void performMeasurement();
+void appendSample(uint32_t timestampUs, int value32, int value35);
+void flushFrame();
+bool frameDue();
 void sendResponse(uint8_t clientNum, const char* type, const char* message);
 
 void setup() {
@@ -51,6 +74,9 @@ void setup() {
 void loop() {
   actualizarWebSocket();
 
+  // Tramas binarias: enviar la trama en curso si se llenó o si su primera muestra ya tiene 50 ms
+  if (binaryMode && frameDue()) flushFrame();
+
   // Verificar si terminó el tiempo de medición
   if (measuring && millis() - measurementStartTime >= measurementDuration) {
     stopMeasurement();
@@ -116,8 +142,10 @@ void webSocketEvent(uint8_t num, WStype_t type, uint8_t * payload, size_t length
       String action = doc["action"];
       if (action == "start_measurement") {
         int duration = doc.containsKey("duration") ? doc["duration"] : 10;
+        const char* format = doc["format"] | "json";
+        binaryMode = strcmp(format, "binary") == 0;
         startMeasurement(duration);
-        sendResponse(num, "status", "Mediciones iniciadas");
+        sendResponse(num, "status", binaryMode ? "Mediciones iniciadas (binario)" : "Mediciones iniciadas");
       } else if (action == "stop_measurement") {
         stopMeasurement();
         sendResponse(num, "status", "Mediciones detenidas");
@@ -135,7 +163,10 @@ void webSocketEvent(uint8_t num, WStype_t type, uint8_t * payload, size_t length
 void startMeasurement(int durationSeconds) {
   measuring = true;
   measurementStartTime = millis();
+  measurementStartUs = micros();
   measurementDuration = durationSeconds * 1000;
+  frameCount = 0;
+  frameSeq = 0;
   digitalWrite(LED_BUILTIN, HIGH);
   Serial.printf("🟢 Iniciando mediciones por %d segundos...\n", durationSeconds);
 
@@ -148,6 +179,7 @@ void stopMeasurement() {
   Serial.println("🔴 Mediciones detenidas.");
 
   measurementTicker.detach();
+  if (binaryMode) flushFrame();  // enviar las muestras que quedaron en la trama incompleta
 
   DynamicJsonDocument doc(200);
   doc["type"] = "measurement_finished";
@@ -165,6 +197,11 @@ void performMeasurement() {
   delayMicroseconds(100); // Delay agregado aquí
   int value35 = analogRead(PIN_35);
 
+  if (binaryMode) {
+    appendSample(micros() - measurementStartUs, value32, value35);
+    return;
+  }
+
   DynamicJsonDocument doc(200);
   doc["type"] = "measurement";
   doc["pin32"] = value32;
@@ -179,6 +216,46 @@ void performMeasurement() {
   Serial.printf("Pin32: %d, Pin35: %d\n", value32, value35);
 }
 
+void appendSample(uint32_t timestampUs, int value32, int value35) {
+  portENTER_CRITICAL(&frameMux);
+  if (frameCount < SAMPLES_PER_FRAME) {  // si loop() no alcanzó a enviar, la muestra se pierde
+    if (frameCount == 0) frameStartUs = micros();
+    uint8_t* p = frameBuffer + FRAME_HEADER_SIZE + frameCount * FRAME_SAMPLE_SIZE;
+    memcpy(p, &timestampUs, 4);  // el ESP32 es little-endian
+    p[4] = value32 & 0xFF;
+    p[5] = ((value32 >> 8) & 0x0F) | ((value35 & 0x0F) << 4);
+    p[6] = (value35 >> 4) & 0xFF;
+    frameCount++;
+  }
+  portEXIT_CRITICAL(&frameMux);
+}
+
+bool frameDue() {
+  portENTER_CRITICAL(&frameMux);
+  bool due = frameCount == SAMPLES_PER_FRAME || (frameCount > 0 && micros() - frameStartUs >= FRAME_MAX_AGE_US);
+  portEXIT_CRITICAL(&frameMux);
+  return due;
+}
+
+void flushFrame() {
+  // Se copia la trama bajo el lock y se envía fuera de él (broadcastBIN puede tardar)
+  portENTER_CRITICAL(&frameMux);
+  uint16_t n = frameCount;
+  memcpy(sendBuffer + FRAME_HEADER_SIZE, frameBuffer + FRAME_HEADER_SIZE, n * FRAME_SAMPLE_SIZE);
+  frameCount = 0;
+  portEXIT_CRITICAL(&frameMux);
+  if (n == 0) return;
+
+  sendBuffer[0] = 'A';
+  sendBuffer[1] = 'R';
+  sendBuffer[2] = FRAME_VERSION;
+  sendBuffer[3] = 2;  // canales
+  memcpy(sendBuffer + 4, &n, 2);
+  memcpy(sendBuffer + 6, &frameSeq, 4);
+  webSocket.broadcastBIN(sendBuffer, FRAME_HEADER_SIZE + n * FRAME_SAMPLE_SIZE);
+  frameSeq++;
+}
+
 void sendResponse(uint8_t clientNum, const char* type, const char* message) {
   DynamicJsonDocument doc(200);
   doc["type"] = type;
@@ -1,9 +1,10 @@
+import os
 import sys
 import json
 import websocket
 from collections import deque
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLabel, QLineEdit, QTextEdit, QSpinBox, QSplitter
-from PyQt5.QtCore import QThread, pyqtSignal, QTimer, Qt
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLabel, QLineEdit, QListView, QSpinBox, QSplitter
+from PyQt5.QtCore import QThread, pyqtSignal, QTimer, Qt, QAbstractListModel, QModelIndex
 from PyQt5.QtGui import QFont
 from websocket import WebSocketApp
 import threading
@@ -11,6 +12,15 @@ import pyqtgraph as pg
 import numpy as np
 from datetime import datetime
 
+# Módulos compartidos con la interfaz ARTEMIS (sirve tanto desde la raíz como desde ESP32_WIFI_V2/)
+_aqui = os.path.dirname(os.path.abspath(__file__))
+for _base in (_aqui, os.path.dirname(_aqui)):
+    if os.path.isdir(os.path.join(_base, "Interfaz ARTEMIS-2")):
+        sys.path.insert(0, os.path.join(_base, "Interfaz ARTEMIS-2"))
+        break
+from Grabador import GrabadorRegistro
+from BufferCircular import BufferCircular
+
 class WebSocketThread(QThread):
     data_received = pyqtSignal(dict)
     connection_status = pyqtSignal(str)
@@ -20,9 +30,6 @@ class WebSocketThread(QThread):
         self.url = url
         self.ws = None
         self.running = False
-
-        # Datos para guardar
-        self.logged_lines = []  # Guardamos las líneas en formato string
         
     def run(self):
         def on_message(ws, message):
@@ -65,6 +72,64 @@ class WebSocketThread(QThread):
         if self.ws:
             self.ws.close()
 
+class ModeloLog(QAbstractListModel):
+    """
+    Modelo de solo lectura con las últimas `capacidad` muestras del log, para un QListView.
+
+    Las muestras se guardan como tuplas (t, braquial, tibial) en un anillo y el texto
+    se arma recién cuando la vista pide una fila visible. agregar() solo encola;
+    volcar() (llamado por un QTimer) inserta todo lo pendiente de una vez.
+    """
+    def __init__(self, capacidad=10000, parent=None):
+        super().__init__(parent)
+        self.capacidad = capacidad
+        self._filas = [None] * capacidad
+        self._inicio = 0
+        self._n = 0
+        self.pendientes = deque(maxlen=capacidad)
+        self.pausado = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._n
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        t, braquial, tibial = self._filas[(self._inicio + index.row()) % self.capacidad]
+        return f'Datos recibidos de Arduino: {json.dumps({"t": t, "braquial": braquial, "tibial": tibial})}'
+
+    def agregar(self, t, braquial, tibial):
+        self.pendientes.append((t, braquial, tibial))
+
+    def volcar(self):
+        # Devuelve True si se agregaron filas (mientras está pausado no se toca la vista)
+        if self.pausado or not self.pendientes:
+            return False
+        nuevas = list(self.pendientes)
+        self.pendientes.clear()
+        sobrantes = self._n + len(nuevas) - self.capacidad
+        if sobrantes > 0:
+            quitar = min(sobrantes, self._n)
+            self.beginRemoveRows(QModelIndex(), 0, quitar - 1)
+            self._inicio = (self._inicio + quitar) % self.capacidad
+            self._n -= quitar
+            self.endRemoveRows()
+
+        self.beginInsertRows(QModelIndex(), self._n, self._n + len(nuevas) - 1)
+        for fila in nuevas:
+            self._filas[(self._inicio + self._n) % self.capacidad] = fila
+            self._n += 1
+        self.endInsertRows()
+        return True
+
+    def limpiar(self):
+        self.beginResetModel()
+        self._inicio = 0
+        self._n = 0
+        self.pendientes.clear()
+        self.endResetModel()
+
+
 class ESP32Controller(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -77,12 +142,29 @@ class ESP32Controller(QMainWindow):
         # Datos para el plotter (ventana de 5 segundos)
         self.window_size = 5000  # 5 segundos en ms
         self.max_points = 50     # Máximo 50 puntos en pantalla
-        self.timestamps = deque()
-        self.data_a0 = deque()
-        self.data_a1 = deque()
+        # Últimas muestras para el gráfico (t relativo en s, pin32 y pin35 en V); la
+        # medición completa la escribe a disco GrabadorRegistro
+        self.muestras = BufferCircular(2**14, 3)
         self.start_time = None
+        self.grabador = None
+        # Muestras para el grabador (t en ms, pin32 y pin35 en V): se encolan por bloques desde
+        # el timer de redibujo, no una por una al llegar
+        self.pendientes_grabador = BufferCircular(4096, 3)
+        self.ultimos_voltajes = None
+        self.datos_nuevos = False
         
         self.init_ui()
+
+        # Las muestras solo se guardan al llegar; el gráfico y los displays se redibujan
+        # a lo sumo 30 veces por segundo, con costo fijo por muestra
+        self.plot_timer = QTimer()
+        self.plot_timer.timeout.connect(self.redibujar_grafico)
+        self.plot_timer.start(33)
+
+        # El log se actualiza por cuadro (no por muestra): todas las filas nuevas de una vez
+        self.log_timer = QTimer()
+        self.log_timer.timeout.connect(self.actualizar_log)
+        self.log_timer.start(33)
         
     def init_ui(self):
         self.setWindowTitle("Controlador ESP32 - Mediciones Analógicas")
@@ -155,11 +237,22 @@ class ESP32Controller(QMainWindow):
         data_layout.addLayout(pin35_layout)
         top_layout.addLayout(data_layout)
         
-        # Log de datos
-        top_layout.addWidget(QLabel("Log de datos:"))
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
-        top_layout.addWidget(self.log_text)
+        # Log de datos (solo las últimas muestras; el registro completo va a disco)
+        log_header = QHBoxLayout()
+        log_header.addWidget(QLabel("Log de datos:"))
+        self.pause_log_btn = QPushButton("Pausar log")
+        self.pause_log_btn.setCheckable(True)
+        self.pause_log_btn.toggled.connect(self.pausar_log)
+        log_header.addWidget(self.pause_log_btn)
+        top_layout.addLayout(log_header)
+        self.modelo_log = ModeloLog(parent=self)
+        self.log_view = QListView()
+        self.log_view.setModel(self.modelo_log)
+        self.log_view.setUniformItemSizes(True)
+        # En modo Batched la vista no recalcula todas las filas en cada inserción
+        self.log_view.setLayoutMode(QListView.Batched)
+        self.log_view.setBatchSize(200)
+        top_layout.addWidget(self.log_view)
 
         # Configuración del gráfico
         self.plot_widget = pg.PlotWidget()
@@ -229,23 +322,34 @@ class ESP32Controller(QMainWindow):
             voltage_a0 = (data["pin32"] / 4095.0) * 3.3
             voltage_a1 = (data["pin35"] / 4095.0) * 3.3
             
-            # Actualizar displays
-            self.pin32_value.setText(f"{voltage_a0:.3f} V")
-            self.pin35_value.setText(f"{voltage_a1:.3f} V")
-            
-            # Actualizar datos del gráfico
+            # Actualizar datos del gráfico y de los displays (se dibujan en redibujar_grafico)
             self.update_plot_data(data["timestamp"], voltage_a0, voltage_a1)
             
-            # Agregar al log en el formato solicitado
-            json_obj = {
-            "t": data["timestamp"],
-            "braquial": voltage_a0,
-            "tibial": voltage_a1
-            }
-            line = f'Datos recibidos de Arduino: {json.dumps(json_obj)}'
-            self.log_text.append(line)
-            self.logged_lines.append(line)  # Guardar en lista para archivo
+            # Agregar al log (el texto se arma solo para las filas visibles)
+            self.modelo_log.agregar(data["timestamp"], voltage_a0, voltage_a1)
+            if self.grabador is not None:
+                if len(self.pendientes_grabador) == self.pendientes_grabador.capacidad:
+                    self.volcar_grabador()
+                self.pendientes_grabador.agregar((data["timestamp"], voltage_a0, voltage_a1))
+
+    def volcar_grabador(self):
+        # Pasa al grabador las muestras acumuladas desde el último cuadro, en un solo bloque
+        if self.grabador is None or len(self.pendientes_grabador) == 0:
+            return
+        t_ms, a0, a1 = self.pendientes_grabador.extraer()
+        self.grabador.agregar(t_ms, (a0, a1))
+
 
+
+    def actualizar_log(self):
+        if self.modelo_log.volcar():
+            # Más barato que scrollToBottom(), que recorre todas las filas del modelo
+            barra = self.log_view.verticalScrollBar()
+            barra.setValue(barra.maximum())
+
+    def pausar_log(self, pausado):
+        self.modelo_log.pausado = pausado
+        self.pause_log_btn.setText("Reanudar log" if pausado else "Pausar log")
             
     def update_plot_data(self, timestamp, voltage_a0, voltage_a1):
         if self.start_time is None:
@@ -253,22 +357,33 @@ class ESP32Controller(QMainWindow):
 
         relative_time = (timestamp - self.start_time) / 1000.0
 
-        self.timestamps.append(relative_time)
-        self.data_a0.append(voltage_a0)
-        self.data_a1.append(voltage_a1)
-
-        # Actualizar curvas
-        self.curve_a0.setData(list(self.timestamps), list(self.data_a0))
-        self.curve_a1.setData(list(self.timestamps), list(self.data_a1))
-
-        # Desplazar la ventana visible para mostrar los últimos datos, sin borrar los anteriores
-        if self.timestamps:
-            current_time = self.timestamps[-1]
-            if current_time > 5.0:  # solo cuando pasamos los 5 segundos
-                window_start = current_time - 5.0
-                self.plot_widget.setXRange(window_start, current_time + 0.5)
-            else:
-                self.plot_widget.setXRange(0, 5)
+        self.muestras.agregar((relative_time, voltage_a0, voltage_a1))
+        self.ultimos_voltajes = (voltage_a0, voltage_a1)
+        self.datos_nuevos = True
+
+    def redibujar_grafico(self):
+        self.volcar_grabador()
+        if not self.datos_nuevos:
+            return
+        self.datos_nuevos = False
+
+        voltage_a0, voltage_a1 = self.ultimos_voltajes
+        self.pin32_value.setText(f"{voltage_a0:.3f} V")
+        self.pin35_value.setText(f"{voltage_a1:.3f} V")
+
+        # Solo la ventana visible: vistas contiguas del buffer circular, sin copiar
+        t, a0, a1 = self.muestras.vista()
+        current_time = t[-1]
+        ventana = self.window_size / 1000.0
+        inicio = np.searchsorted(t, current_time - ventana)
+        self.curve_a0.setData(t[inicio:], a0[inicio:])
+        self.curve_a1.setData(t[inicio:], a1[inicio:])
+
+        # Desplazar la ventana visible para mostrar los últimos datos
+        if current_time > ventana:  # solo cuando pasamos los 5 segundos
+            self.plot_widget.setXRange(current_time - ventana, current_time + 0.5)
+        else:
+            self.plot_widget.setXRange(0, ventana)
                 
     def toggle_measurements(self):
         if not self.measuring:
@@ -277,12 +392,23 @@ class ESP32Controller(QMainWindow):
             self.stop_measurements()
             
     def start_measurements(self):
-        self.logged_lines = []
-
         if self.websocket_thread:
             # Limpiar datos anteriores
             self.clear_plot_data()
             
+            # Las muestras se graban a disco a medida que llegan (.txt y .art)
+            self.pendientes_grabador.limpiar()
+            timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+            try:
+                self.grabador = GrabadorRegistro(
+                    [f"mediciones_{timestamp_str}.txt", f"mediciones_{timestamp_str}.art"],
+                    metadatos={"fecha": datetime.now().isoformat(timespec="seconds")}
+                )
+                self.grabador.start()
+            except OSError as e:
+                print(f"Error al crear el archivo de la medición: {e}")
+                self.grabador = None
+
             duration = self.duration_input.value()
             command = {"action": "start_measurement", "duration": duration}
             self.websocket_thread.send_command(command)
@@ -297,16 +423,15 @@ class ESP32Controller(QMainWindow):
             
     def clear_plot_data(self):
         """Limpiar datos del gráfico para una nueva medición"""
-        self.timestamps.clear()
-        self.data_a0.clear()
-        self.data_a1.clear()
+        self.muestras.limpiar()
         self.start_time = None
+        self.datos_nuevos = False
         
         # Limpiar las curvas
         self.curve_a0.setData([], [])
         self.curve_a1.setData([], [])
             
-        self.log_text.clear()
+        self.modelo_log.limpiar()
             
     def stop_measurements(self):
         if self.websocket_thread:
@@ -320,23 +445,27 @@ class ESP32Controller(QMainWindow):
         self.measure_btn.setEnabled(True)
         self.duration_input.setEnabled(True)
 
-        # Guardar archivo de texto al finalizar
-        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"mediciones_{timestamp_str}.txt"
-        try:
-            with open(filename, 'w') as f:
-                for line in self.logged_lines:
-                    f.write(line + '\n')
-            print(f"Archivo guardado: {filename}")
-        except Exception as e:
-            print(f"Error al guardar archivo: {e}")
+        self.cerrar_grabador()
+
+    def cerrar_grabador(self):
+        # Termina de escribir lo encolado y cierra los archivos de la medición
+        if self.grabador is None:
+            return
+        self.volcar_grabador()
+        self.grabador.cerrar()
+        for ruta in self.grabador.rutas:
+            print(f"Archivo guardado: {ruta}")
+        if self.grabador.bloques_descartados:
+            print(f"⚠️ {self.grabador.bloques_descartados} bloques no se pudieron grabar")
+        self.grabador = None
 
-            
     def closeEvent(self, event):
         if self.measurement_timer:
             self.measurement_timer.stop()
         if self.websocket_thread:
             self.disconnect_websocket()
+        self.cerrar_grabador()
+        self.muestras.cerrar()
         event.accept()
 
 if __name__ == "__main__":
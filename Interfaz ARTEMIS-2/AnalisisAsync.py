@@ -0,0 +1,121 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, CancelledError
+import numpy as np
+from scipy.signal import sosfiltfilt
+from PyQt5.QtCore import QObject, pyqtSignal
+from Filtros import diseno_notch, diseno_pasabajo
+from Procesamiento import calcular_vop_arrays, calcular_cavi
+
+
+def _filtro_visualizacion(x, fs):
+    # Mismo filtrado que RealTimeGraph.apply_notch + filtro_pasabajo (20 Hz) para la vista completa.
+    # Los huecos del remuestreo (NaN) se saltean para que no se propaguen a toda la señal.
+    validos = np.isfinite(x)
+    y = x[validos]
+    for sos in (diseno_notch(fs, 50, 30), diseno_pasabajo(fs, 20)):
+        if len(y) > 3 * (2 * len(sos) + 1):
+            y = sosfiltfilt(sos, y)
+    if validos.all():
+        return y
+    salida = np.full(len(x), np.nan)
+    salida[validos] = y
+    return salida
+
+
+def tarea_analisis(t, braquial, tibial, altura_cm, fs=200, sistolica=None, diastolica=None):
+    """
+    Análisis completo de un registro; se ejecuta en otro proceso (o hilo), nunca en el de la GUI.
+
+    Returns:
+    dict: vop_list, vop (mediana), fc, cavi, braquial_filt/tibial_filt (señales de
+    calcular_vop, NaN en las filas inválidas) y braquial_vista/tibial_vista
+    (notch + pasabajo, para mostrar el registro completo).
+    """
+    t = np.asarray(t, dtype=float)
+    braquial = np.asarray(braquial, dtype=float)
+    tibial = np.asarray(tibial, dtype=float)
+    braquial_filt = np.empty(len(t))
+    tibial_filt = np.empty(len(t))
+    vop_list, fc = calcular_vop_arrays(t, braquial, tibial, altura_cm, fs, filt_out=(braquial_filt, tibial_filt))
+
+    vop = float(np.median(vop_list)) if vop_list else None
+    cavi = None
+    if vop is not None and sistolica is not None and diastolica is not None:
+        cavi = calcular_cavi(vop, sistolica, diastolica)
+    return {
+        "vop_list": vop_list,
+        "vop": vop,
+        "fc": fc,
+        "cavi": cavi,
+        "braquial_filt": braquial_filt,
+        "tibial_filt": tibial_filt,
+        "braquial_vista": _filtro_visualizacion(braquial, fs),
+        "tibial_vista": _filtro_visualizacion(tibial, fs),
+    }
+
+
+class EjecutorAnalisis(QObject):
+    """
+    Corre tarea_analisis en un pool de procesos y devuelve el resultado por señales.
+
+    Cada trabajo tiene un número; al pedir uno nuevo (por ejemplo, al cargar otro
+    archivo) el anterior se cancela si todavía no empezó y, si ya estaba corriendo,
+    su resultado se descarta al llegar. Las señales se emiten desde el hilo del pool,
+    por lo que Qt las entrega encoladas en el hilo de la GUI.
+    """
+    resultado_listo = pyqtSignal(int, dict)
+    error = pyqtSignal(int, str)
+
+    def __init__(self, parent=None, usar_procesos=True):
+        super().__init__(parent)
+        self.usar_procesos = usar_procesos
+        self._pool = None
+        self._futuro = None
+        self.trabajo_actual = 0
+
+    def _obtener_pool(self):
+        # El pool se crea recién con el primer trabajo y se reutiliza (crear procesos es caro)
+        if self._pool is None:
+            if self.usar_procesos:
+                self._pool = ProcessPoolExecutor(max_workers=1)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=1)
+        return self._pool
+
+    def enviar(self, t, braquial, tibial, altura_cm, fs=200, sistolica=None, diastolica=None):
+        """Encola un análisis, cancelando el pendiente. Devuelve el número de trabajo."""
+        self.cancelar()
+        self.trabajo_actual += 1
+        trabajo = self.trabajo_actual
+        self._futuro = self._obtener_pool().submit(
+            tarea_analisis, t, braquial, tibial, altura_cm, fs, sistolica, diastolica
+        )
+        self._futuro.add_done_callback(lambda futuro: self._terminado(trabajo, futuro))
+        return trabajo
+
+    def cancelar(self):
+        # Invalida el trabajo en curso: no se emitirá su resultado
+        if self._futuro is not None:
+            self._futuro.cancel()
+            self._futuro = None
+            self.trabajo_actual += 1
+
+    def ocupado(self):
+        return self._futuro is not None and not self._futuro.done()
+
+    def _terminado(self, trabajo, futuro):
+        if trabajo != self.trabajo_actual:
+            return
+        try:
+            resultado = futuro.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            self.error.emit(trabajo, str(e))
+            return
+        self.resultado_listo.emit(trabajo, resultado)
+
+    def cerrar(self):
+        self.cancelar()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
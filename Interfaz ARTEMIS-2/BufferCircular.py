@@ -0,0 +1,110 @@
+import os
+import tempfile
+import numpy as np
+
+
+class BufferCircular:
+    """
+    Buffer circular preasignado de capacidad fija para varias columnas (canales).
+
+    Los datos se guardan por canal, con cada muestra escrita dos veces (en i y en
+    i + capacidad), así las últimas muestras de un canal siempre se pueden leer
+    como una vista contigua sin copiar, aunque el buffer haya dado la vuelta.
+
+    Con desborde (una ruta, o True para un archivo temporal) las muestras que se
+    van a sobrescribir se agregan antes a ese archivo, así historial() puede
+    devolver la sesión completa sin que la memoria crezca con su duración. El
+    archivo temporal se crea recién la primera vez que hace falta; cerrar() lo borra.
+    """
+    def __init__(self, capacidad, columnas=1, dtype=float, desborde=None):
+        self.capacidad = int(capacidad)
+        self.columnas = int(columnas)
+        self._datos = np.zeros((self.columnas, 2 * self.capacidad), dtype=dtype)
+        self._pos = 0
+        self._n = 0
+        self.total = 0        # muestras agregadas desde el último limpiar()
+        self.descartadas = 0  # muestras sobrescritas por falta de lugar (sin desborde)
+        self.desbordadas = 0  # muestras pasadas al archivo de desborde
+
+        self._temporal = desborde is True
+        self.desborde = desborde  # True mientras el archivo temporal no exista
+        if self.desborde and not self._temporal:
+            open(self.desborde, 'wb').close()
+
+    def __len__(self):
+        return self._n
+
+    def agregar(self, filas):
+        # filas: array (m, columnas) o una sola fila (columnas,)
+        filas = np.asarray(filas, dtype=self._datos.dtype).reshape(-1, self.columnas)
+        m = len(filas)
+        if m == 0:
+            return
+        self.total += m
+        sobrantes = max(0, self._n + m - self.capacidad)
+        if sobrantes and self.desborde:
+            self._desbordar(sobrantes, filas)
+        else:
+            self.descartadas += sobrantes
+        if m > self.capacidad:
+            filas = filas[-self.capacidad:]
+            self._pos = (self._pos + m - self.capacidad) % self.capacidad
+            m = self.capacidad
+
+        idx = (self._pos + np.arange(m)) % self.capacidad
+        self._datos[:, idx] = filas.T
+        self._datos[:, idx + self.capacidad] = filas.T
+        self._pos = (self._pos + m) % self.capacidad
+        self._n = min(self._n + m, self.capacidad)
+
+    def _desbordar(self, k, filas):
+        # Escribe en disco, por filas, las k muestras más viejas que se van a perder
+        viejas = self.vista()[:, :k]
+        if self.desborde is True:
+            descriptor, self.desborde = tempfile.mkstemp(prefix="artemis_", suffix=".buf")
+            os.close(descriptor)
+        with open(self.desborde, 'ab') as f:
+            np.ascontiguousarray(viejas.T).tofile(f)
+            if k > viejas.shape[1]:
+                np.ascontiguousarray(filas[:k - viejas.shape[1]]).tofile(f)
+        self.desbordadas += k
+
+    def vista(self):
+        # Vista (columnas, n) de las muestras guardadas, de la más vieja a la más nueva
+        inicio = (self._pos - self._n) % self.capacidad
+        return self._datos[:, inicio:inicio + self._n]
+
+    def columna(self, i):
+        return self.vista()[i]
+
+    def historial(self):
+        # Todo lo agregado desde limpiar(), (columnas, n): lo desbordado a disco más lo que está en memoria.
+        # Sin desborde devuelve la vista, sin copiar.
+        if not self.desbordadas:
+            return self.vista()
+        en_disco = np.fromfile(self.desborde, dtype=self._datos.dtype).reshape(-1, self.columnas).T
+        return np.concatenate((en_disco, self.vista()), axis=1)
+
+    def ultimos(self, k):
+        return self.vista()[:, max(0, self._n - k):]
+
+    def extraer(self):
+        # Copia de lo guardado y vacía el buffer (lo usa el hilo de red para armar bloques)
+        bloque = self.vista().copy()
+        self._n = 0
+        return bloque
+
+    def limpiar(self):
+        self._pos = 0
+        self._n = 0
+        self.total = 0
+        self.descartadas = 0
+        self.desbordadas = 0
+        if self.desborde and self.desborde is not True:
+            open(self.desborde, 'wb').close()
+
+    def cerrar(self):
+        # Borra el archivo de desborde si era temporal
+        if self._temporal and isinstance(self.desborde, str) and os.path.exists(self.desborde):
+            os.remove(self.desborde)
+        self.desborde = None
@@ -2,18 +2,42 @@ from PyQt5.QtCore import QThread, pyqtSignal
 import websocket
 import json
 import time
+import numpy as np
+from Protocolo import es_trama_binaria, decodificar_trama, desenrollar_tiempos
+from BufferCircular import BufferCircular
 
 class WebSocketThread(QThread):
     data_received = pyqtSignal(dict)
+    # Bloque de muestras como array (1 + canales, n): timestamp en ms y una fila por canal
+    block_received = pyqtSignal(object)
     connection_status = pyqtSignal(str)
 
-    def __init__(self, url):
+    def __init__(self, url, fps_bloques=30, capacidad_bloque=4096,
+                 canales=("braquial", "tibial"), claves_json=("pin32", "pin35")):
         super().__init__()
         self.url = url
+        # Nombre de cada canal, en el orden de las filas del bloque. En JSON cada canal
+        # viene en su clave (claves_json); en binario, por posición dentro de la trama.
+        self.canales = tuple(canales)
+        self.claves_json = tuple(claves_json)
         self.ws = None
         self.running = False
         self.last_data = None
 
+        # Las muestras se acumulan en el hilo de red y se envían a la GUI como
+        # bloques a lo sumo fps_bloques veces por segundo, no una señal por muestra
+        self.intervalo_bloques = 1.0 / fps_bloques
+        self.pendientes = BufferCircular(capacidad_bloque, 1 + len(self.canales))
+        self.ultima_emision = 0.0
+        self.bloques_emitidos = 0
+        self.muestras_agrupadas = 0
+
+        # Control de tramas binarias perdidas a partir del número de secuencia
+        self.ultima_secuencia = None
+        self.ultimo_t_us = None  # último timestamp desenrollado (micros() da la vuelta a los ~71.6 min)
+        self.tramas_recibidas = 0
+        self.tramas_perdidas = 0
+
     def run(self):
         self.running = True
         self.connection_status.emit("Conectando...")
@@ -33,17 +57,70 @@ class WebSocketThread(QThread):
         self.connection_status.emit("Conectado")
 
     def on_message(self, ws, message):
+        if isinstance(message, (bytes, bytearray)):
+            self.on_binary_message(message)
+            return
         try:
             json_obj = json.loads(message)
-            self.last_data = json_obj
-            self.data_received.emit(json_obj)
         except Exception as e:
             print(f"[WebSocket Error] Mensaje no JSON válido: {message}")
+            return
+        self.last_data = json_obj
+        if "timestamp" in json_obj and all(k in json_obj for k in self.claves_json):
+            self.agregar_muestras([[json_obj["timestamp"]] + [json_obj[k] for k in self.claves_json]])
+        else:
+            # Mensajes de control (status, measurement_finished): primero se entrega lo pendiente
+            self.emitir_bloque()
+            self.data_received.emit(json_obj)
+
+    def on_binary_message(self, message):
+        # Trama con varias muestras (formato "binary" del ESP32); JSON sigue siendo el formato por defecto
+        if not es_trama_binaria(message):
+            print(f"[WebSocket Error] Trama binaria desconocida ({len(message)} bytes)")
+            return
+        try:
+            secuencia, t_us, valores = decodificar_trama(message)
+        except Exception as e:
+            print(f"[WebSocket Error] Trama binaria inválida: {e}")
+            return
+        if self.ultima_secuencia is not None and secuencia > self.ultima_secuencia + 1:
+            self.tramas_perdidas += secuencia - self.ultima_secuencia - 1
+        if self.ultima_secuencia is not None and secuencia <= self.ultima_secuencia:
+            self.ultimo_t_us = None  # la secuencia volvió a empezar: es otra medición
+        self.ultima_secuencia = secuencia
+        t_us = desenrollar_tiempos(t_us, self.ultimo_t_us)
+        if len(t_us):
+            self.ultimo_t_us = int(t_us[-1])
+        self.tramas_recibidas += 1
+        if valores.shape[1] < len(self.canales):
+            print(f"[WebSocket Error] La trama trae {valores.shape[1]} canales, se esperaban {len(self.canales)}")
+            return
+        self.agregar_muestras(np.column_stack((t_us / 1000.0, valores[:, :len(self.canales)])))
+
+    def agregar_muestras(self, filas):
+        filas = np.asarray(filas, dtype=float).reshape(-1, 1 + len(self.canales))
+        if len(self.pendientes) + len(filas) > self.pendientes.capacidad:
+            self.emitir_bloque()  # no esperar al próximo cuadro si el bloque se llenaría
+        self.pendientes.agregar(filas)
+        if time.monotonic() - self.ultima_emision >= self.intervalo_bloques:
+            self.emitir_bloque()
+
+    def emitir_bloque(self):
+        if len(self.pendientes) == 0:
+            return
+        bloque = self.pendientes.extraer()
+        self.ultima_emision = time.monotonic()
+        self.bloques_emitidos += 1
+        self.muestras_agrupadas += bloque.shape[1]
+        self.block_received.emit(bloque)
 
     def on_error(self, ws, error):
         self.connection_status.emit(f"Error: {error}")
 
     def on_close(self, ws, close_status_code, close_msg):
+        self.emitir_bloque()
+        if self.tramas_recibidas:
+            print(f"[WebSocket] Tramas recibidas: {self.tramas_recibidas}, perdidas: {self.tramas_perdidas}")
         self.connection_status.emit("Desconectado")
 
     def send_command(self, command):
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Reducción de puntos para graficar registros largos: el costo de dibujo queda
+# acotado por el ancho en píxeles del gráfico y no por la duración del registro.
+
+
+def envolvente_min_max(x, y, n_pixeles):
+    """
+    Envolvente min/max: divide la señal en n_pixeles intervalos y conserva el
+    mínimo y el máximo de cada uno (en orden temporal), así los picos no se pierden.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    n_pixeles = max(int(n_pixeles), 1)
+    if n <= 2 * n_pixeles:
+        return x, y
+
+    tam = n // n_pixeles
+    n_bins = n // tam
+    bloques = y[:n_bins * tam].reshape(n_bins, tam)
+    i_min = bloques.argmin(axis=1)
+    i_max = bloques.argmax(axis=1)
+    base = np.arange(n_bins) * tam
+    idx = np.empty(2 * n_bins, dtype=np.intp)
+    idx[0::2] = base + np.minimum(i_min, i_max)
+    idx[1::2] = base + np.maximum(i_min, i_max)
+    if n_bins * tam < n:
+        idx = np.append(idx, n - 1)
+    return x[idx], y[idx]
+
+
+def lttb(x, y, n_puntos):
+    """Largest-Triangle-Three-Buckets: n_puntos que conservan la forma visual de la señal."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_puntos >= n or n_puntos < 3:
+        return x, y
+
+    bordes = np.linspace(1, n - 1, n_puntos - 1).astype(np.intp)
+    idx = np.empty(n_puntos, dtype=np.intp)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(n_puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        sig_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        x_medio = x[fin:sig_fin].mean()
+        y_medio = y[fin:sig_fin].mean()
+        areas = np.abs((x[a] - x_medio) * (y[inicio:fin] - y[a]) - (x[a] - x[inicio:fin]) * (y_medio - y[a]))
+        a = inicio + int(np.argmax(areas))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+
+def decimar(x, y, n_pixeles, metodo="minmax"):
+    if metodo == "lttb":
+        return lttb(x, y, 2 * int(n_pixeles))
+    return envolvente_min_max(x, y, n_pixeles)
@@ -0,0 +1,184 @@
+import sys
+from collections import deque
+import numpy as np
+from scipy.signal import lfilter
+from Filtros import FiltroStreaming, diseno_pasaaltos, diseno_pasabajo
+from Procesamiento import emparejar_pies, distancia_arterial, PTT_VALIDO, PTT_SIN_TIBIAL
+
+
+class _CanalOnline:
+    """
+    Detector de pies de onda para un canal, bloque a bloque.
+
+    Replica en forma causal lo que hace calcular_vop: pasabanda 0.5-16 Hz, derivada,
+    y picos de la derivada por encima de un umbral adaptativo. El umbral usa
+    estadísticas móviles (promedio exponencial de la derivada y de la señal al
+    cuadrado) en lugar del desvío estándar de todo el registro.
+    """
+    def __init__(self, fs, factor_umbral, tau=5.0, periodo_refractario=0.2, calentamiento=2.0):
+        self.fs = fs
+        self.factor_umbral = factor_umbral
+        self.alfa = 1.0 / (tau * fs)
+        self.periodo_refractario = periodo_refractario
+        self.muestras_calentamiento = int(calentamiento * fs)
+        self.filtro = FiltroStreaming(np.vstack([diseno_pasaaltos(fs, 0.5), diseno_pasabajo(fs, 16)]))
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.filtro.reiniciar()
+        self.ultimo_y = None
+        self.var_y = None
+        self.var_g = None
+        self.g_previos = np.empty(0)
+        self.t_previos = np.empty(0)
+        self.u_previos = np.empty(0)
+        self.ultimo_pie = -np.inf
+        self.muestras = 0
+
+    def _promedio_movil(self, x, estado):
+        # Promedio exponencial muestra a muestra, continuando desde el estado anterior
+        if estado is None:
+            estado = x[0]
+        y, _ = lfilter([self.alfa], [1, self.alfa - 1], x, zi=[(1 - self.alfa) * estado])
+        return y
+
+    def procesar(self, t, x):
+        y = self.filtro.procesar(x)
+        previo = y[0] if self.ultimo_y is None else self.ultimo_y
+        g = np.diff(y, prepend=previo) * self.fs
+        self.ultimo_y = y[-1]
+
+        var_y = self._promedio_movil(y * y, self.var_y)
+        var_g = self._promedio_movil(g * g, self.var_g)
+        self.var_y, self.var_g = var_y[-1], var_g[-1]
+        # Mismo criterio que calcular_vop (sobre la señal normalizada): max(k·std(grad), 0.15)
+        umbral = np.maximum(self.factor_umbral * np.sqrt(var_g), 0.15 * np.sqrt(var_y))
+
+        # Se agregan las 2 últimas muestras del bloque anterior (con su umbral) para detectar
+        # máximos en el borde: la última de cada bloque recién se evalúa en el siguiente
+        n_previos = len(self.g_previos)
+        g_ext = np.concatenate((self.g_previos, g))
+        t_ext = np.concatenate((self.t_previos, t))
+        u_ext = np.concatenate((self.u_previos, umbral))
+        i = np.arange(1, len(g_ext) - 1)
+        es_pico = (g_ext[i] > g_ext[i - 1]) & (g_ext[i] >= g_ext[i + 1]) & (g_ext[i] >= u_ext[i])
+        if self.muestras < self.muestras_calentamiento:
+            es_pico &= (self.muestras - n_previos + i) >= self.muestras_calentamiento
+        self.muestras += len(x)
+        self.g_previos = g_ext[-2:]
+        self.t_previos = t_ext[-2:]
+        self.u_previos = u_ext[-2:]
+
+        # Vértice de la parábola por el máximo y sus vecinos: pie con resolución sub-muestra
+        picos = i[es_pico]
+        izq, centro, der = g_ext[picos - 1], g_ext[picos], g_ext[picos + 1]
+        curvatura = izq - 2 * centro + der
+        desplazamiento = np.zeros(len(picos))
+        np.divide(0.5 * (izq - der), curvatura, out=desplazamiento, where=curvatura < 0)
+        t_picos = t_ext[picos] + np.clip(desplazamiento, -0.5, 0.5) * (t_ext[picos + 1] - t_ext[picos - 1]) / 2
+
+        pies = []
+        for t_pico in t_picos:
+            if t_pico - self.ultimo_pie >= self.periodo_refractario:
+                pies.append(t_pico)
+                self.ultimo_pie = t_pico
+        return pies
+
+
+class DetectorPiesOnline:
+    """
+    Detección incremental de pies braquiales/tibiales durante la adquisición,
+    con PTT, VOP y frecuencia cardíaca móviles (medianas de las últimas mediciones).
+    La memoria es acotada: solo se guardan estados de filtros y colas de largo fijo.
+    """
+    def __init__(self, fs=200, altura_cm=None, latidos=15, ptt_min=0.12, ptt_max=0.35):
+        self.fs = fs
+        self.distancia = distancia_arterial(altura_cm) if altura_cm else None
+        self.ptt_min = ptt_min
+        self.ptt_max = ptt_max
+        self.braquial = _CanalOnline(fs, 0.8)
+        self.tibial = _CanalOnline(fs, 0.7)
+        self.braquiales_pendientes = deque(maxlen=8)
+        self.ptts = deque(maxlen=latidos)
+        self.rr = deque(maxlen=latidos)
+        self.ultimo_braquial = None
+
+    def reiniciar(self):
+        self.braquial.reiniciar()
+        self.tibial.reiniciar()
+        self.braquiales_pendientes.clear()
+        self.ptts.clear()
+        self.rr.clear()
+        self.ultimo_braquial = None
+
+    def procesar_bloque(self, t, braquial, tibial):
+        """
+        Procesa un bloque de muestras (t en segundos) y devuelve los pies detectados
+        como lista de eventos (canal, t_pie) ordenados por tiempo.
+        """
+        t = np.asarray(t, dtype=float)
+        if t.size == 0:
+            return []
+        pies_b = self.braquial.procesar(t, np.asarray(braquial, dtype=float))
+        pies_t = self.tibial.procesar(t, np.asarray(tibial, dtype=float))
+
+        for t_pie in pies_b:
+            if self.ultimo_braquial is not None:
+                rr = t_pie - self.ultimo_braquial
+                if 0.5 < rr < 1.2:
+                    self.rr.append(rr)
+            self.ultimo_braquial = t_pie
+        self.braquiales_pendientes.extend(pies_b)
+
+        if pies_t and self.braquiales_pendientes:
+            ptt, _, _, motivo = emparejar_pies(
+                list(self.braquiales_pendientes), pies_t, self.ptt_min, self.ptt_max
+            )
+            self.ptts.extend(ptt[motivo == PTT_VALIDO].tolist())
+            # Quedan pendientes solo los pies braquiales que todavía no tienen un tibial posterior
+            sin_par = [b for b, m in zip(self.braquiales_pendientes, motivo) if m == PTT_SIN_TIBIAL]
+            self.braquiales_pendientes.clear()
+            self.braquiales_pendientes.extend(sin_par)
+
+        eventos = [("braquial", p) for p in pies_b] + [("tibial", p) for p in pies_t]
+        return sorted(eventos, key=lambda e: e[1])
+
+    @property
+    def ptt(self):
+        return float(np.median(self.ptts)) if self.ptts else None
+
+    @property
+    def vop(self):
+        if self.distancia is None or not self.ptts:
+            return None
+        return self.distancia / self.ptt
+
+    @property
+    def fc(self):
+        return 60.0 / float(np.median(self.rr)) if self.rr else None
+
+
+def pies_por_bloques(t, braquial, tibial, fs, tam_bloque):
+    # Eventos de un registro completo entregado en bloques de tam_bloque muestras
+    detector = DetectorPiesOnline(fs=fs)
+    eventos = []
+    for i in range(0, len(t), tam_bloque):
+        eventos += detector.procesar_bloque(t[i:i + tam_bloque], braquial[i:i + tam_bloque], tibial[i:i + tam_bloque])
+    return eventos
+
+
+if __name__ == "__main__":
+    # Verificación: el mismo registro tiene que dar los mismos pies sin importar el tamaño de bloque
+    # (WebSocketThread emite a 30 cuadros/s, es decir bloques de 1 a 7 muestras)
+    from GeneradorPulsos import generar_registro
+    t_ms, braquial, tibial, verdad = generar_registro(40, fs=200, semilla=3)
+    referencia = pies_por_bloques(t_ms / 1000, braquial, tibial, 200, len(t_ms))
+    print(f"{len(verdad['pies_braquial'])} pies braquiales reales, {sum(c == 'braquial' for c, _ in referencia)} detectados")
+    for tam_bloque in (1, 2, 7, 1000):
+        eventos = pies_por_bloques(t_ms / 1000, braquial, tibial, 200, tam_bloque)
+        iguales = len(eventos) == len(referencia) and all(
+            c == c_ref and abs(p - p_ref) < 1e-9 for (c, p), (c_ref, p_ref) in zip(eventos, referencia)
+        )
+        print(f"bloques de {tam_bloque:4d} muestras: {len(eventos)} eventos, {'OK' if iguales else 'DISTINTOS'}")
+        if not iguales:
+            sys.exit(1)
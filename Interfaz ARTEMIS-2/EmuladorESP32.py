@@ -0,0 +1,216 @@
+"""
+Servidor WebSocket local que reemplaza al ESP32 (ESP32_WIFI_V2.ino) para pruebas de
+punta a punta sin hardware.
+
+Ejemplo:
+    python EmuladorESP32.py --puerto 8081 --fs 1000
+    python EmuladorESP32.py --archivo Señales/nico.txt --fs 100
+
+Habla el mismo protocolo que el firmware: acepta {"action": "start_measurement",
+"duration": s, "format": "json"|"binary"} y {"action": "stop_measurement"}, envía las
+muestras como {"type": "measurement", ...} o en tramas binarias de Protocolo, y al
+terminar manda {"type": "measurement_finished"}. Las muestras salen de un registro
+de Señales/ (remuestreado a la frecuencia pedida y repetido en bucle) o de
+GeneradorPulsos, a la frecuencia pedida.
+
+Como el ESP32, si el cliente no alcanza a leer (buffer de envío lleno) la trama se
+descarta y la secuencia sigue, así el cliente ve el hueco. Al final de cada medición
+se informan las muestras enviadas, las tramas descartadas y las que salieron tarde.
+"""
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+import websockets
+from Protocolo import codificar_trama
+from Registros import leer_registro, ESCALA_ADC
+from Remuestreo import remuestrear
+from GeneradorPulsos import generar_registro
+
+MUESTRAS_POR_TRAMA = 20              # igual que SAMPLES_PER_FRAME del firmware
+LIMITE_BUFFER_ENVIO = 256 * 1024     # bytes pendientes a partir de los cuales se descarta la trama
+
+
+class FuenteMuestras:
+    """Entrega lecturas del ADC (0-4095) de dos canales, repitiendo la señal en bucle."""
+    def __init__(self, archivo=None, fs=100, semilla=None):
+        if archivo:
+            # Los registros están a su propia frecuencia (~50 Hz): se pasan a fs para que el
+            # tiempo de la señal coincida con el de las muestras enviadas. Los huecos se saltean.
+            t_ms, braquial, tibial, _ = leer_registro(archivo)
+            _, senales, _ = remuestrear(t_ms, (braquial, tibial), fs=fs)
+            braquial, tibial = senales[:, np.isfinite(senales).all(axis=0)]
+        else:
+            _, braquial, tibial, _ = generar_registro(60, fs=fs, ruido=0.01, semilla=semilla)
+        senales = np.column_stack((braquial, tibial)) / ESCALA_ADC
+        self.valores = np.clip(np.round(senales), 0, 4095).astype(np.uint16)
+        self.pos = 0
+
+    def leer(self, n):
+        idx = (self.pos + np.arange(n)) % len(self.valores)
+        self.pos = (self.pos + n) % len(self.valores)
+        return self.valores[idx]
+
+
+class EstadisticasMedicion:
+    def __init__(self):
+        self.muestras = 0
+        self.tramas = 0
+        self.descartadas = 0
+        self.tardias = 0
+        self.retraso_max_ms = 0.0
+
+    def como_dict(self):
+        return {
+            "muestras": self.muestras,
+            "tramas": self.tramas,
+            "tramas_descartadas": self.descartadas,
+            "tramas_tardias": self.tardias,
+            "retraso_max_ms": round(self.retraso_max_ms, 2),
+        }
+
+
+class EmuladorESP32:
+    def __init__(self, fs=100, archivo=None, tolerancia_ms=50.0, semilla=None):
+        self.fs = fs
+        self.fuente = FuenteMuestras(archivo, fs, semilla)
+        self.tolerancia_ms = tolerancia_ms
+        self.inicio = time.monotonic()
+        self.clientes = set()
+        self.tarea_medicion = None
+        self.envios = set()  # envíos en curso: se guardan para que no los recolecte el GC
+
+    def millis(self):
+        return int((time.monotonic() - self.inicio) * 1000)
+
+    async def responder(self, ws, tipo, mensaje, **extra):
+        await ws.send(json.dumps(dict({"type": tipo, "message": mensaje}, **extra)))
+
+    async def atender(self, ws):
+        self.clientes.add(ws)
+        print(f"🔌 Cliente conectado: {ws.remote_address}")
+        await self.responder(ws, "status", "Conectado a ESP32")
+        try:
+            async for mensaje in ws:
+                try:
+                    comando = json.loads(mensaje)
+                except (TypeError, json.JSONDecodeError):
+                    await self.responder(ws, "error", "JSON inválido")
+                    continue
+                accion = comando.get("action")
+                if accion == "start_measurement":
+                    binario = comando.get("format", "json") == "binary"
+                    self.detener()
+                    self.tarea_medicion = asyncio.create_task(
+                        self.medir(float(comando.get("duration", 10)), binario)
+                    )
+                    await self.responder(ws, "status", "Mediciones iniciadas (binario)" if binario else "Mediciones iniciadas")
+                elif accion == "stop_measurement":
+                    self.detener()
+                    await self.responder(ws, "status", "Mediciones detenidas")
+                else:
+                    await self.responder(ws, "error", "Comando no reconocido")
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.clientes.discard(ws)
+            print("❌ Cliente desconectado")
+
+    def detener(self):
+        if self.tarea_medicion is not None and not self.tarea_medicion.done():
+            self.tarea_medicion.cancel()
+        self.tarea_medicion = None
+
+    def enviar(self, mensaje, estadisticas):
+        # broadcast sin esperar: si un cliente tiene el buffer lleno, se le descarta la trama
+        for ws in list(self.clientes):
+            if ws.transport.get_write_buffer_size() > LIMITE_BUFFER_ENVIO:
+                estadisticas.descartadas += 1
+                continue
+            self.enviar_sin_esperar(ws, mensaje)
+
+    def enviar_sin_esperar(self, ws, mensaje):
+        tarea = asyncio.ensure_future(ws.send(mensaje))
+        self.envios.add(tarea)
+        tarea.add_done_callback(self._envio_terminado)
+
+    def _envio_terminado(self, tarea):
+        self.envios.discard(tarea)
+        if tarea.cancelled():
+            return
+        error = tarea.exception()
+        if error is not None and not isinstance(error, websockets.ConnectionClosed):
+            print(f"[Emulador] Error al enviar: {error!r}")
+
+    async def medir(self, duracion_s, binario):
+        estadisticas = EstadisticasMedicion()
+        muestras_por_mensaje = MUESTRAS_POR_TRAMA if binario else 1
+        periodo = muestras_por_mensaje / self.fs
+        inicio = time.monotonic()
+        secuencia = 0
+        print(f"🟢 Midiendo {duracion_s:.0f} s a {self.fs:.0f} Hz ({'binario' if binario else 'JSON'})")
+        try:
+            while True:
+                ahora = time.monotonic()
+                if ahora - inicio >= duracion_s:
+                    break
+                # Se generan todas las muestras que ya deberían haber salido (reloj absoluto, sin deriva)
+                pendientes = int((ahora - inicio) * self.fs) - estadisticas.muestras
+                while pendientes >= muestras_por_mensaje:
+                    retraso_ms = ((ahora - inicio) - (estadisticas.muestras + muestras_por_mensaje) / self.fs) * 1000
+                    estadisticas.retraso_max_ms = max(estadisticas.retraso_max_ms, retraso_ms)
+                    if retraso_ms > self.tolerancia_ms:
+                        estadisticas.tardias += 1
+
+                    valores = self.fuente.leer(muestras_por_mensaje)
+                    # Como el firmware: la trama lleva µs desde el inicio de la medición y el JSON, millis()
+                    t_us = (estadisticas.muestras + np.arange(muestras_por_mensaje)) / self.fs * 1e6
+                    if binario:
+                        mensaje = codificar_trama(secuencia, t_us, valores)
+                        secuencia += 1
+                    else:
+                        mensaje = json.dumps({
+                            "type": "measurement", "pin32": int(valores[0, 0]), "pin35": int(valores[0, 1]),
+                            "timestamp": int((inicio - self.inicio) * 1000 + t_us[0] / 1000),
+                        })
+                    self.enviar(mensaje, estadisticas)
+                    estadisticas.muestras += muestras_por_mensaje
+                    estadisticas.tramas += 1
+                    pendientes -= muestras_por_mensaje
+                await asyncio.sleep(max(0.0, periodo - (time.monotonic() - ahora)))
+        finally:
+            resumen = estadisticas.como_dict()
+            print(f"🔴 Mediciones detenidas: {resumen}")
+            mensaje = json.dumps({"type": "measurement_finished", "message": "Mediciones completadas", **resumen})
+            for ws in list(self.clientes):
+                self.enviar_sin_esperar(ws, mensaje)
+
+
+async def servir(emulador, host, puerto):
+    async with websockets.serve(emulador.atender, host, puerto, max_size=None):
+        print(f"Emulador ESP32 escuchando en ws://{host}:{puerto}")
+        await asyncio.Future()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emulador local del ESP32 de ARTEMIS (WebSocket).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8081)
+    parser.add_argument("--fs", type=float, default=100, help="Frecuencia de muestreo emulada (100 Hz a 5 kHz)")
+    parser.add_argument("--archivo", default=None, help="Registro de Señales/ a reproducir (si no, señal sintética)")
+    parser.add_argument("--tolerancia", type=float, default=50.0, help="Retraso (ms) a partir del cual una trama es tardía")
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args(argv)
+    if not 100 <= args.fs <= 5000:
+        parser.error("--fs tiene que estar entre 100 y 5000 Hz")
+
+    emulador = EmuladorESP32(args.fs, args.archivo, args.tolerancia, args.semilla)
+    try:
+        asyncio.run(servir(emulador, args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
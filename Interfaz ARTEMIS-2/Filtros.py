@@ -0,0 +1,59 @@
+from functools import lru_cache
+import numpy as np
+from scipy.signal import butter, iirnotch, tf2sos, sosfilt, sosfilt_zi
+
+
+@lru_cache(maxsize=32)
+def _sos_en_cache(tipo, fs, cutoff, order, Q):
+    # El array guardado es de solo lectura: nadie puede alterar el filtro de los demás
+    if tipo == 'notch':
+        b, a = iirnotch(cutoff, Q, fs)
+        sos = tf2sos(b, a)
+    else:
+        sos = butter(order, cutoff / (0.5 * fs), btype=tipo, output='sos')
+    sos.setflags(write=False)
+    return sos
+
+def diseno_sos(tipo, fs, cutoff, order=4, Q=30):
+    """
+    Diseña un filtro en forma SOS y lo guarda en caché por (tipo, fs, cutoff, order, Q),
+    así los análisis repetidos y la graficación en vivo no vuelven a llamar a butter/iirnotch.
+
+    tipo: 'low' o 'high' (Butterworth de orden `order`) o 'notch' (cutoff = f0, factor Q).
+    Devuelve una copia del array en caché (unos pocos coeficientes): scipy.signal.sosfilt
+    no acepta arrays de solo lectura.
+    """
+    return _sos_en_cache(tipo, fs, cutoff, order, Q).copy()
+
+def diseno_pasabajo(fs, cutoff, order=4):
+    return diseno_sos('low', fs, cutoff, order)
+
+def diseno_pasaaltos(fs, cutoff, order=4):
+    return diseno_sos('high', fs, cutoff, order)
+
+def diseno_notch(fs, f0=50, Q=30):
+    return diseno_sos('notch', fs, f0, Q=Q)
+
+
+class FiltroStreaming:
+    """
+    Filtro causal en forma SOS que conserva su estado (zi) entre llamadas,
+    de modo que cada bloque nuevo se filtra sin volver a procesar el historial.
+    """
+    def __init__(self, sos):
+        self.sos = np.asarray(sos, dtype=float)
+        self._zi_unitario = sosfilt_zi(self.sos)
+        self.zi = None
+
+    def procesar(self, x):
+        x = np.asarray(x, dtype=float)
+        if x.size == 0:
+            return x
+        if self.zi is None:
+            # Arrancar en régimen permanente con la primera muestra (evita el transitorio inicial)
+            self.zi = self._zi_unitario * x[0]
+        y, self.zi = sosfilt(self.sos, x, zi=self.zi)
+        return y
+
+    def reiniciar(self):
+        self.zi = None
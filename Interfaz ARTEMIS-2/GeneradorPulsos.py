@@ -0,0 +1,145 @@
+"""
+Generador de registros sintéticos braquial/tibial con VOP conocida, para pruebas
+de carga y de exactitud de calcular_vop.
+
+Ejemplo:
+    python GeneradorPulsos.py sintetico.txt --duracion 600 --fs 200 --fc 72 --ptt 0.2 --ruido 0.02 --red 0.05
+
+Las imperfecciones de los registros reales se pueden activar una por una: ruido
+blanco, interferencia de la red (50 Hz), deriva de la línea de base, cortes de
+datos y timestamps de ms repetidos. La interferencia de red necesita fs mayor al
+doble de su frecuencia: muestreada a 50 Hz, la de 50 Hz sería una constante.
+"""
+import argparse
+import numpy as np
+from Registros import guardar_registro_txt, ESCALA_ADC
+
+
+def forma_pulso(tau, subida=0.12, caida=0.3, dicrota=0.25):
+    """
+    Onda de pulso normalizada en función del tiempo desde el pie (s): subida en
+    coseno alzado hasta el pico, caída exponencial y onda dícrota. Vale 0 para tau < 0.
+    """
+    tau = np.asarray(tau, dtype=float)
+    onda = np.zeros_like(tau)
+    en_subida = (tau >= 0) & (tau < subida)
+    onda[en_subida] = 0.5 * (1 - np.cos(np.pi * tau[en_subida] / subida))
+    en_caida = tau >= subida
+    resto = tau[en_caida] - subida
+    onda[en_caida] = np.exp(-resto / caida) + dicrota * np.exp(-0.5 * ((resto - 0.22) / 0.04) ** 2)
+    return onda
+
+
+def tiempos_de_pies(duracion_s, fc_bpm=70, variabilidad_fc=0.03, rng=None):
+    # Instantes de los pies braquiales (s), con intervalos RR alrededor de 60/fc
+    rng = np.random.default_rng() if rng is None else rng
+    rr = 60.0 / fc_bpm
+    n = int(np.ceil(duracion_s / rr)) + 2
+    intervalos = rr * (1 + variabilidad_fc * rng.standard_normal(n))
+    pies = 0.3 + np.cumsum(np.clip(intervalos, 0.5 * rr, 1.5 * rr))
+    return pies[pies < duracion_s]
+
+
+def _senal(t, pies, linea_base, amplitud):
+    # Suma de los latidos vecinos de cada muestra (a lo sumo 3 s de cola por latido)
+    senal = np.full(len(t), linea_base, dtype=float)
+    inicios = np.searchsorted(t, pies)
+    fines = np.searchsorted(t, pies + 3.0)
+    for pie, inicio, fin in zip(pies, inicios, fines):
+        senal[inicio:fin] += amplitud * forma_pulso(t[inicio:fin] - pie)
+    return senal
+
+
+def generar_registro(duracion_s, fs=50, fc_bpm=70, ptt_s=0.2, variabilidad_fc=0.03, variabilidad_ptt=0.0,
+                     ruido=0.01, red=0.0, frecuencia_red=50.0, deriva=0.0, cortes_por_minuto=0.0,
+                     duplicados=0.0, cuantizar=True, t0_ms=0, semilla=None):
+    """
+    Genera un registro de dos canales con PTT conocido.
+
+    Parameters:
+    duracion_s (float): Duración del registro en segundos.
+    fs (float): Frecuencia de muestreo real (los registros del ESP32 rondan 50 Hz).
+    ptt_s (float): Tiempo de tránsito braquial-tibial; variabilidad_ptt es su desvío (s).
+    ruido, red, deriva (float): Amplitud en V del ruido blanco, de la interferencia de
+        frecuencia_red y de la deriva lenta (0.1-0.3 Hz) de la línea de base. Con red,
+        fs tiene que ser mayor a 2·frecuencia_red (ValueError si no).
+    cortes_por_minuto (float): Cortes de datos (0.05-0.5 s sin muestras) por minuto.
+    duplicados (float): Probabilidad de que una muestra repita el timestamp (ms) de la anterior.
+
+    Returns:
+    tuple: (t_ms, braquial, tibial, verdad), con verdad un dict con los pies braquiales
+    y tibiales (s desde el inicio), los PTT de cada latido, fc_bpm y ptt_s.
+    """
+    if red and fs <= 2 * frecuencia_red:
+        raise ValueError(f"Con fs={fs} Hz la interferencia de {frecuencia_red} Hz queda submuestreada "
+                         f"(se vería su alias); use fs > {2 * frecuencia_red:g} Hz")
+    rng = np.random.default_rng(semilla)
+    t = np.arange(0, duracion_s, 1.0 / fs)
+
+    pies_braquial = tiempos_de_pies(duracion_s, fc_bpm, variabilidad_fc, rng)
+    ptt = ptt_s + variabilidad_ptt * rng.standard_normal(len(pies_braquial))
+    pies_tibial = pies_braquial + ptt
+
+    braquial = _senal(t, pies_braquial, 1.5, 0.8)
+    tibial = _senal(t, pies_tibial, 1.3, 0.6)
+    for senal in (braquial, tibial):
+        if ruido:
+            senal += ruido * rng.standard_normal(len(t))
+        if red:
+            senal += red * np.sin(2 * np.pi * frecuencia_red * t + rng.uniform(0, 2 * np.pi))
+        if deriva:
+            senal += deriva * np.sin(2 * np.pi * rng.uniform(0.1, 0.3) * t + rng.uniform(0, 2 * np.pi))
+        if cuantizar:
+            np.clip(senal, 0, 3.3, out=senal)
+            senal[:] = np.round(senal / ESCALA_ADC) * ESCALA_ADC
+
+    t_ms = np.floor(t0_ms + t * 1000)
+    if duplicados:
+        repetidas = np.flatnonzero(rng.random(len(t)) < duplicados)
+        repetidas = repetidas[repetidas > 0]
+        t_ms[repetidas] = t_ms[repetidas - 1]
+        t_ms = np.maximum.accumulate(t_ms)
+
+    conservar = np.ones(len(t), dtype=bool)
+    for _ in range(rng.poisson(cortes_por_minuto * duracion_s / 60)):
+        inicio = rng.uniform(0, duracion_s)
+        conservar &= (t < inicio) | (t >= inicio + rng.uniform(0.05, 0.5))
+
+    verdad = {
+        "pies_braquial": pies_braquial,
+        "pies_tibial": pies_tibial,
+        "ptt": ptt,
+        "fc_bpm": fc_bpm,
+        "ptt_s": ptt_s,
+    }
+    return t_ms[conservar], braquial[conservar], tibial[conservar], verdad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un registro sintético en el formato de texto del ESP32.")
+    parser.add_argument("salida", help="Archivo .txt a escribir")
+    parser.add_argument("--duracion", type=float, default=60, help="Duración en segundos")
+    parser.add_argument("--fs", type=float, default=50, help="Frecuencia de muestreo (Hz)")
+    parser.add_argument("--fc", type=float, default=70, help="Frecuencia cardíaca (bpm)")
+    parser.add_argument("--ptt", type=float, default=0.2, help="PTT braquial-tibial (s)")
+    parser.add_argument("--ruido", type=float, default=0.01)
+    parser.add_argument("--red", type=float, default=0.0,
+                        help="Amplitud de la interferencia de 50 Hz (V); requiere --fs mayor a 100")
+    parser.add_argument("--deriva", type=float, default=0.0, help="Amplitud de la deriva de línea de base (V)")
+    parser.add_argument("--cortes", type=float, default=0.0, help="Cortes de datos por minuto")
+    parser.add_argument("--duplicados", type=float, default=0.0, help="Proporción de timestamps repetidos")
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.red and args.fs <= 100:
+        parser.error("--red requiere --fs mayor a 100 Hz (la red de 50 Hz quedaría submuestreada)")
+
+    t_ms, braquial, tibial, verdad = generar_registro(
+        args.duracion, fs=args.fs, fc_bpm=args.fc, ptt_s=args.ptt, ruido=args.ruido, red=args.red,
+        deriva=args.deriva, cortes_por_minuto=args.cortes, duplicados=args.duplicados, semilla=args.semilla
+    )
+    guardar_registro_txt(args.salida, t_ms, braquial, tibial)
+    print(f"{len(t_ms)} muestras, {len(verdad['pies_braquial'])} latidos, PTT {args.ptt:.3f} s -> {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import time
+import queue
+import threading
+import numpy as np
+from Registros import (
+    cabecera_binaria, muestras_binarias, lineas_registro_txt, abrir_registro_binario,
+    actualizar_metadatos_binario, ESCALA_ADC
+)
+from Remuestreo import estimar_reloj
+
+
+class GrabadorRegistro(threading.Thread):
+    """
+    Hilo que escribe las muestras a disco a medida que llegan, en uno o más archivos
+    (.art y/o .txt, según la extensión de cada ruta).
+
+    agregar() solo encola el bloque (cola acotada, sin esperar: si está llena el bloque
+    se descarta y se cuenta en bloques_descartados); el hilo lo escribe y hace flush
+    enseguida, y fsync cada intervalo_fsync segundos. Si el programa se cae se pierde
+    a lo sumo el bloque que se estaba escribiendo: el .art deduce la cantidad de
+    muestras del tamaño del archivo, así que una fila cortada al final se ignora.
+
+    Al cerrar se estima la frecuencia de muestreo real a partir de los timestamps
+    grabados y se guarda como metadato "fs_estimada" en la cabecera del .art.
+    """
+    def __init__(self, rutas, canales=("braquial", "tibial"), fs=None, metadatos=None,
+                 max_bloques=256, intervalo_fsync=1.0):
+        super().__init__(daemon=True)
+        self.rutas = [rutas] if isinstance(rutas, str) else list(rutas)
+        self.canales = tuple(canales)
+        self.intervalo_fsync = intervalo_fsync
+        self.cola = queue.Queue(maxsize=max_bloques)
+        self.muestras_escritas = 0
+        self.bloques_descartados = 0
+        self.error = None
+
+        self._archivos = []
+        for ruta in self.rutas:
+            binario = ruta.lower().endswith(".art")
+            archivo = open(ruta, 'wb')
+            if binario:
+                archivo.write(cabecera_binaria(self.canales, fs, ESCALA_ADC, metadatos, reserva=64))
+                archivo.flush()
+            self._archivos.append((archivo, binario))
+
+    def agregar(self, t_ms, senales):
+        """Encola un bloque: t_ms (n,) y una señal (n,) por canal. Nunca bloquea a quien llama."""
+        bloque = (np.array(t_ms, dtype=float, ndmin=1), [np.array(s, dtype=float, ndmin=1) for s in senales])
+        try:
+            self.cola.put_nowait(bloque)
+        except queue.Full:
+            self.bloques_descartados += 1
+
+    def run(self):
+        ultimo_fsync = time.monotonic()
+        terminar = False
+        while not terminar:
+            bloques = [self.cola.get()]
+            # Se juntan los bloques que ya estén en la cola para escribirlos de una vez
+            while True:
+                try:
+                    bloques.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            if any(b is None for b in bloques):
+                terminar = True
+                bloques = bloques[:[b is None for b in bloques].index(True)]
+            if bloques:
+                self._escribir(bloques)
+            if terminar or time.monotonic() - ultimo_fsync >= self.intervalo_fsync:
+                self._fsync()
+                ultimo_fsync = time.monotonic()
+        for archivo, _ in self._archivos:
+            archivo.close()
+
+    def _escribir(self, bloques):
+        t_ms = np.concatenate([t for t, _ in bloques])
+        senales = [np.concatenate([s[i] for _, s in bloques]) for i in range(len(self.canales))]
+        try:
+            for archivo, binario in self._archivos:
+                if binario:
+                    archivo.write(muestras_binarias(t_ms, senales, self.canales).tobytes())
+                else:
+                    archivo.write(lineas_registro_txt(t_ms, *senales[:2]).encode('utf-8'))
+                archivo.flush()
+            self.muestras_escritas += len(t_ms)
+        except OSError as e:
+            self.error = e
+            print(f"[Grabador] Error al escribir: {e}")
+
+    def _fsync(self):
+        for archivo, _ in self._archivos:
+            try:
+                os.fsync(archivo.fileno())
+            except OSError:
+                pass
+
+    def cerrar(self):
+        # Escribe lo que quede en la cola y cierra los archivos
+        if self.is_alive():
+            self.cola.put(None)
+            self.join()
+        else:
+            for archivo, _ in self._archivos:
+                archivo.close()
+        for ruta in self.rutas:
+            if ruta.lower().endswith(".art"):
+                self._registrar_fs(ruta)
+
+    def _registrar_fs(self, ruta):
+        try:
+            muestras, _ = abrir_registro_binario(ruta)
+            _, fs_estimada = estimar_reloj(muestras["t"])
+            del muestras
+            actualizar_metadatos_binario(ruta, fs_estimada=fs_estimada)
+        except (OSError, ValueError) as e:
+            print(f"[Grabador] No se pudo guardar la fs estimada en {ruta}: {e}")
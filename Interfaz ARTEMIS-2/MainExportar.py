@@ -8,6 +8,7 @@ from PyQt5.QtGui import QPixmap, QFont, QPalette, QColor, QPainter
 from PyQt5.QtCore import Qt, QDateTime
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from Decimacion import envolvente_min_max
 
 
 
@@ -71,20 +72,21 @@ def export_image(self):
 
         # Re-plot the signals onto the temporary axes
         if hasattr(self, "t_vals_raw") and self.t_vals_raw.size > 0:
-            # Plot all data, not just a 5-second window
-            t_all = self.t_vals_raw
-            b_all_filt = self.braquial_vals_filt
-            t_all_filt = self.tibial_vals_filt
+            # Plot all data, not just a 5-second window, reduced to a min/max envelope
+            # at the figure's pixel width so long recordings render in bounded time
+            n_pixeles = int(temp_fig.get_figwidth() * temp_fig.dpi)
+            t_b, b_all_filt = envolvente_min_max(self.t_vals_raw, self.braquial_vals_filt, n_pixeles)
+            t_t, t_all_filt = envolvente_min_max(self.t_vals_raw, self.tibial_vals_filt, n_pixeles)
             
             # Plot on braquial axes
-            temp_axes_braquial.plot(t_all, b_all_filt, color='red', label="Braquial")
+            temp_axes_braquial.plot(t_b, b_all_filt, color='red', label="Braquial")
             temp_axes_braquial.set_title("Señal Braquial")
             temp_axes_braquial.set_ylabel("Amplitud")
             temp_axes_braquial.legend(loc='upper right')
             temp_axes_braquial.grid(True)
 
             # Plot on tibial axes
-            temp_axes_tibial.plot(t_all, t_all_filt, color='blue', label="Tibial")
+            temp_axes_tibial.plot(t_t, t_all_filt, color='blue', label="Tibial")
             temp_axes_tibial.set_title("Señal Tibial")
             temp_axes_tibial.set_xlabel("Tiempo (s)")
             temp_axes_tibial.set_ylabel("Amplitud")
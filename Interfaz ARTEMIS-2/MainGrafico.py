@@ -12,52 +12,44 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from scipy.signal import butter, filtfilt, find_peaks
 from ScalableImage import ScalableImage
-from Procesamiento import lowpass_filter, highpass_filter, calcular_cavi, calcular_vop, normalize
+from Procesamiento import lowpass_filter, highpass_filter, calcular_cavi, normalize
 from RealTimeGraph import RealTimeGraph
+from Registros import leer_registro
+from Remuestreo import remuestrear
 
 
 def leer_y_graficar(self):
-    path, _ = QFileDialog.getOpenFileName(self, "Seleccionar archivo", "", "Text Files (*.txt)")
+    path, _ = QFileDialog.getOpenFileName(self, "Seleccionar archivo", "", "Registros (*.txt *.art);;Text Files (*.txt);;Registros binarios (*.art)")
     if not path:
         return
 
-    rt = self.graph_rt
-
     try:
         altura_cm = float(self.altura)
     except ValueError:
         QMessageBox.warning(self, "Entrada inválida", "La altura debe ser un número válido.")
         return
 
-    datos = []
     try:
-        with open(path, 'r') as archivo:
-            for linea in archivo:
-                if "Datos recibidos de Arduino:" in linea:
-                    try:
-                        json_str = linea.strip().split("Datos recibidos de Arduino: ")[1]
-                        dato = json.loads(json_str)
-                        if all(k in dato for k in ["t", "braquial", "tibial"]):
-                            datos.append({
-                                "t": float(dato["t"]),
-                                "braquial": float(dato["braquial"]),
-                                "tibial": float(dato["tibial"])
-                            })
-                    except Exception:
-                        continue
-    except FileNotFoundError:
+        t_ms, braquial, tibial, malformadas = leer_registro(path)
+    except (OSError, ValueError):
         QMessageBox.critical(self, "Error", f"No se pudo leer el archivo {path}")
         return
 
-    if not datos:
+    if len(t_ms) == 0:
         QMessageBox.warning(self, "Sin datos", "No se encontraron datos válidos.")
         return
+    if malformadas:
+        print(f"⚠️ {malformadas} líneas inválidas ignoradas en {path}")
 
-    fs=50
-    t0 = datos[0]["t"]
-    self.t_vals_raw = np.array([(d["t"]-t0) / 1000 for d in datos])
-    self.braquial_vals_raw = np.array([d["braquial"] for d in datos])
-    self.tibial_vals_raw = np.array([d["tibial"] for d in datos])
+    # Los timestamps del ESP32 tienen jitter, ms repetidos y huecos: se reconstruye el reloj
+    # real y se pasa a la grilla uniforme de 200 Hz que supone el análisis
+    fs = 200
+    t_ms, (braquial, tibial), self.fs_estimada = remuestrear(t_ms, (braquial, tibial), fs=fs)
+    if self.fs_estimada is not None:
+        print(f"Frecuencia de muestreo estimada: {self.fs_estimada:.2f} Hz")
+    self.t_vals_raw = (t_ms - t_ms[0]) / 1000
+    self.braquial_vals_raw = braquial
+    self.tibial_vals_raw = tibial
     
     self.scroll_slider.setValue(0)
 
@@ -66,53 +58,49 @@ def leer_y_graficar(self):
     except ValueError:
         self.subject_age_result = None
 
-    # Usar la nueva función para filtrar, graficar y calcular VOP/CAVI
+    # Filtrar y calcular VOP/CAVI en segundo plano; al terminar se muestra la señal completa
     procesar_y_graficar(
         self,
         self.t_vals_raw,
         self.braquial_vals_raw,
         self.tibial_vals_raw,
-        float(self.altura)
+        float(self.altura),
+        vista_completa=True
     )
-
-    # Y hacé esto en su lugar:
-    arr_t = self.t_vals_raw
-    arr_b = rt.filtro_pasabajo(rt.apply_notch(self.braquial_vals_raw))
-    arr_ti = rt.filtro_pasabajo(rt.apply_notch(self.tibial_vals_raw))
-
-    rt.curve_braquial.setData(arr_t, arr_b)
-    rt.curve_tibial.setData(arr_t, arr_ti)
-
-    # Ajustar la vista a toda la señal
-    if len(arr_t) > 0:
-        t_max = arr_t[-1]
-        rt.plot_widget.setXRange(0, t_max)
     
+def construir_indice_tiempo(self, t, braquial, tibial):
+    # Índice ordenado por tiempo (desde 0) que se arma una vez por registro: update_plot_window
+    # corta cada ventana con searchsorted, en O(log N) y devolviendo vistas, sin máscaras ni copias
+    t = np.asarray(t, dtype=float)
+    braquial = np.asarray(braquial)
+    tibial = np.asarray(tibial)
+    if t.size > 1 and np.any(np.diff(t) < 0):
+        orden = np.argsort(t, kind='stable')
+        t, braquial, tibial = t[orden], braquial[orden], tibial[orden]
+    if t.size > 0:
+        t = t - t[0]
+    self.indice_tiempo = (t, braquial, tibial)
+
 def update_plot_window(self, start_time):
     end_time = start_time + 5  # Ventana de 5 segundos
 
-    # Si hay datos filtrados, usalos
-    if hasattr(self, "t_vals_filt") and self.t_vals_filt.size > 0:
-        t_base = self.t_vals_filt
-        braquial_base = self.braquial_vals_filt
-        tibial_base = self.tibial_vals_filt
-    # Si no, usá los datos raw
-    elif hasattr(self, "t_vals_raw") and self.t_vals_raw.size > 0:
-        t_base = self.t_vals_raw
-        braquial_base = self.braquial_vals_raw
-        tibial_base = self.tibial_vals_raw
-    else:
-        print("❌ No hay datos para graficar")
-        return
-
-    idx = np.where((t_base >= start_time) & (t_base <= end_time))[0]
-
-    if idx.size > 1:
-        t_window = t_base[idx]
-        b_window = braquial_base[idx]
-        t2_window = tibial_base[idx]
-        self.graph_rt.clear()
-        self.graph_rt.plot_dual_signal(t_window, b_window, t2_window)
+    if getattr(self, "indice_tiempo", None) is None:
+        # Si hay datos filtrados, usalos
+        if hasattr(self, "t_vals_filt") and self.t_vals_filt.size > 0:
+            construir_indice_tiempo(self, self.t_vals_filt, self.braquial_vals_filt, self.tibial_vals_filt)
+        # Si no, usá los datos raw
+        elif hasattr(self, "t_vals_raw") and len(self.t_vals_raw) > 0:
+            construir_indice_tiempo(self, self.t_vals_raw, self.braquial_vals_raw, self.tibial_vals_raw)
+        else:
+            print("❌ No hay datos para graficar")
+            return
+
+    t_base, braquial_base, tibial_base = self.indice_tiempo
+    inicio = np.searchsorted(t_base, start_time, side='left')
+    fin = np.searchsorted(t_base, end_time, side='right')
+
+    if fin - inicio > 1:
+        self.graph_rt.plot_dual_signal(t_base[inicio:fin], braquial_base[inicio:fin], tibial_base[inicio:fin])
     else:
         print("⚠️ No hay datos en la ventana de tiempo seleccionada.")
 
@@ -137,18 +125,57 @@ def update_plot_window(self, start_time):
             #self.graph_rt.clear() 
 """
             
-def procesar_y_graficar(self, t_array, braquial_array, tibial_array, altura_cm):
+def procesar_y_graficar(self, t_array, braquial_array, tibial_array, altura_cm, vista_completa=False):
+    # Encola el análisis en EjecutorAnalisis (otro proceso); mostrar_analisis dibuja el resultado.
+    # Si había un análisis en curso (otro archivo), se cancela.
     fs = 200
-    self.t_vals_raw = t_array
-    self.braquial_vals_raw = braquial_array
-    self.tibial_vals_raw = tibial_array
+    self.t_vals_raw = np.asarray(t_array, dtype=float)
+    self.braquial_vals_raw = np.asarray(braquial_array, dtype=float)
+    self.tibial_vals_raw = np.asarray(tibial_array, dtype=float)
+    self.vista_completa_pendiente = vista_completa
+
+    self.indice_tiempo = None
+    self.scroll_slider.setEnabled(False)
+    self.report_button.setEnabled(False)
+    self.export_image_button.setEnabled(False)
+    self.vop_box.setText("VOP: calculando...")
+    self.fc_box.setText("Frecuencia: -- bpm")
+    self.cavi_box.setText("CAVI: --")
+
+    self.ejecutor_analisis.enviar(
+        self.t_vals_raw, self.braquial_vals_raw, self.tibial_vals_raw, altura_cm, fs,
+        getattr(self, 'subject_sistolica', None), getattr(self, 'subject_diastolica', None)
+    )
+
+def error_analisis(self, trabajo, mensaje):
+    # La señal llega encolada: el trabajo pudo quedar viejo después de emitirla
+    if trabajo != self.ejecutor_analisis.trabajo_actual:
+        return
+    print(f"[ERROR procesamiento] {mensaje}")
+    self.vop_box.setText("VOP: Error")
+    self.fc_box.setText("Frecuencia: --")
+    self.cavi_box.setText("CAVI: --")
+    self.report_button.setEnabled(False)
+    self.export_image_button.setEnabled(False)
+
+def mostrar_analisis(self, trabajo, resultado):
+    # Un resultado emitido antes de un enviar() nuevo puede llegar después: corresponde a otro registro
+    if trabajo != self.ejecutor_analisis.trabajo_actual:
+        return
+    t_array = self.t_vals_raw
+    self.braquial_vals_filt = resultado["braquial_filt"]
+    self.tibial_vals_filt = resultado["tibial_filt"]
+    vop_list = resultado["vop_list"]
+    freq_bpm = resultado["fc"]
 
-    self.braquial_vals_filt = lowpass_filter(highpass_filter(self.braquial_vals_raw, fs), fs)
-    self.tibial_vals_filt = lowpass_filter(highpass_filter(self.tibial_vals_raw, fs), fs)
+    construir_indice_tiempo(self, t_array, self.braquial_vals_filt, self.tibial_vals_filt)
+    duracion = float(self.indice_tiempo[0][-1]) if len(t_array) > 0 else 0.0
+    self.scroll_slider.setMaximum(int(max(duracion - 5, 0) * 100))
+    self.scroll_slider.setEnabled(duracion > 5)
 
     # Calcular límites del eje Y
-    min_y = min(self.braquial_vals_filt.min(), self.tibial_vals_filt.min())
-    max_y = max(self.braquial_vals_filt.max(), self.tibial_vals_filt.max())
+    min_y = min(np.nanmin(self.braquial_vals_filt), np.nanmin(self.tibial_vals_filt))
+    max_y = max(np.nanmax(self.braquial_vals_filt), np.nanmax(self.tibial_vals_filt))
     margin = (max_y - min_y) * 0.1
     self.graph_rt.y_min = min_y - margin
     self.graph_rt.y_max = max_y + margin
@@ -156,20 +183,18 @@ def procesar_y_graficar(self, t_array, braquial_array, tibial_array, altura_cm):
     # Mostrar primeros 5 segundos (o hasta lo que haya)
     self.update_plot_window(0)
 
-    # Calcular VOP y frecuencia
-    datos_dict = [
-        {"t": t * 1000, "braquial": b, "tibial": ti}
-        for t, b, ti in zip(t_array, braquial_array, tibial_array)
-    ]
-    vop_list, freq_bpm = calcular_vop(datos_dict, altura_cm, fs)
+    if self.vista_completa_pendiente and len(t_array) > 0:
+        # Ajustar la vista a toda la señal; al hacer zoom se vuelve a decimar el rango visible
+        self.graph_rt.plot_widget.setXRange(0, t_array[-1], padding=0)
+        self.graph_rt.mostrar_senal_completa(t_array, resultado["braquial_vista"], resultado["tibial_vista"])
 
     if vop_list and hasattr(self, 'subject_sistolica') and hasattr(self, 'subject_diastolica'):
-        self.subject_vop_result = np.median(vop_list)
+        self.subject_vop_result = resultado["vop"]
         self.subject_fc_result = freq_bpm
         self.vop_box.setText(f"VOP: {self.subject_vop_result:.2f} m/s")
         self.fc_box.setText(f"Frecuencia: {freq_bpm:.0f} bpm")
 
-        cavi = calcular_cavi(self.subject_vop_result, self.subject_sistolica, self.subject_diastolica)
+        cavi = resultado["cavi"]
         self.subject_cavi_result = cavi
         self.cavi_box.setText(f"CAVI: {cavi:.2f}" if cavi is not None else "CAVI: N/A")
 
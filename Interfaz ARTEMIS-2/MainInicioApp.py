@@ -8,7 +8,7 @@ from PyQt5.QtWidgets import (
     QFileDialog, QStackedLayout, QGroupBox, QFrame, QSlider, QSizePolicy 
 )
 from PyQt5.QtGui import QPixmap, QFont, QPalette, QColor, QPainter
-from PyQt5.QtCore import Qt, QDateTime
+from PyQt5.QtCore import Qt, QDateTime, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from scipy.signal import butter, filtfilt, find_peaks
@@ -25,12 +25,17 @@ from RealTimeGraph import RealTimeGraph
 def init_app(self):
         self.artemis_header_app = ArtemisHeader(self)
 
-        self.graph_rt = RealTimeGraph(self)
+        self.graph_rt = RealTimeGraph(self, canales=[c.capitalize() for c in self.canales_rt])
         self.scroll_slider = QSlider(Qt.Horizontal)
         self.scroll_slider.setEnabled(False)
         self.scroll_slider.setMinimum(0)
         # El slider maneja valores enteros, por lo que multiplicamos y dividimos por 100 para simular decimales.
-        self.scroll_slider.valueChanged.connect(lambda val: self.update_plot_window(val / 100.0)) 
+        # Los movimientos se agrupan: como mucho un redibujo por cuadro (~60 Hz) con el último valor.
+        self.slider_timer = QTimer(self)
+        self.slider_timer.setSingleShot(True)
+        self.slider_timer.setInterval(16)
+        self.slider_timer.timeout.connect(lambda: self.update_plot_window(self.scroll_slider.value() / 100.0))
+        self.scroll_slider.valueChanged.connect(lambda val: self.slider_timer.isActive() or self.slider_timer.start())
         
         # Datos del paciente en pantalla 2
         self.nombre_label = QLabel()
@@ -1,3 +1,4 @@
+import os
 import sys
 import json
 import numpy as np
@@ -23,17 +24,25 @@ from Procesamiento import lowpass_filter, highpass_filter, calcular_cavi, calcul
 from MainExportar import export_image,exportar_hl7
 from MainValidacion import validar, set_field_error_style
 from MainInicioApp import init_app
-from MainGrafico import leer_y_graficar, update_plot_window, procesar_y_graficar
+from MainGrafico import leer_y_graficar, update_plot_window, procesar_y_graficar, mostrar_analisis, error_analisis
 from MainInicio import init_inicio 
 from MainReport import init_report_page,show_report_page
 from RealTimeGraph import RealTimeGraph
+from DetectorOnline import DetectorPiesOnline
+from AnalisisAsync import EjecutorAnalisis
+from BufferCircular import BufferCircular
+from Grabador import GrabadorRegistro
+from Remuestreo import remuestrear, estimar_reloj
 from datetime import datetime
 
 class MainWindow(QWidget):        
     def iniciar_medicion_tiempo_real(self):
         if self.websocket_thread is None or not self.websocket_thread.isRunning():
-            self.websocket_thread = WebSocketThread("ws://172.20.10.2:81")  # Dirección de tu ESP32
+            # Dirección de tu ESP32; ARTEMIS_ESP32_URL permite apuntar al emulador (EmuladorESP32.py)
+            url = os.environ.get("ARTEMIS_ESP32_URL", "ws://172.20.10.2:81")
+            self.websocket_thread = WebSocketThread(url, canales=self.canales_rt)
             self.websocket_thread.data_received.connect(self.on_data_received_rt)
+            self.websocket_thread.block_received.connect(self.on_block_received_rt)
             self.websocket_thread.connection_status.connect(self.on_connection_status_rt)
             self.websocket_thread.start()
 
@@ -43,11 +52,35 @@ class MainWindow(QWidget):
             if hasattr(self, 'graph_rt'):
                 self.graph_rt.clear()
 
-            self.timestamps_rt = []
-            self.braquial_vals_rt = []
-            self.tibial_vals_rt = []
+            self.buffer_rt.limpiar()
             self.measuring = True
 
+            # Estimación de VOP en vivo mientras se adquiere (el resultado final lo da procesar_y_graficar).
+            # El detector se crea en crear_detector_rt, cuando ya se puede estimar la fs real del stream
+            self.detector_rt = None
+            self.vop_box.setText("VOP (en vivo): -- m/s")
+            self.fc_box.setText("Frecuencia (en vivo): -- bpm")
+
+            # Las muestras se graban a disco a medida que llegan (.txt y .art con los datos del paciente)
+            timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+            metadatos = {
+                "paciente": getattr(self, "nombre_completo", ""),
+                "edad": getattr(self, "edad", None),
+                "altura": getattr(self, "altura", None),
+                "sistolica": getattr(self, "subject_sistolica", None),
+                "diastolica": getattr(self, "subject_diastolica", None),
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+            }
+            try:
+                self.grabador_rt = GrabadorRegistro(
+                    [f"mediciones_{timestamp_str}.txt", f"mediciones_{timestamp_str}.art"],
+                    canales=self.canales_rt, metadatos=metadatos  # fs real: fs_estimada, al cerrar
+                )
+                self.grabador_rt.start()
+            except OSError as e:
+                print(f"Error al crear el archivo de la medición: {e}")
+                self.grabador_rt = None
+
             self.iniciar_medicion_button.setText("Midiendo...")
             self.iniciar_medicion_button.setEnabled(False)
         else:
@@ -57,7 +90,8 @@ class MainWindow(QWidget):
         print(f"[Estado WebSocket] {status}")
         if status == "Conectado":
             duracion = 35  # segundos
-            comando = {"action": "start_measurement", "duration": duracion}
+            # Se pide el formato binario; un firmware que no lo soporte sigue enviando JSON
+            comando = {"action": "start_measurement", "duration": duracion, "format": "binary"}
             self.websocket_thread.send_command(comando)
 
             # Configurar un temporizador para detener medición
@@ -67,24 +101,61 @@ class MainWindow(QWidget):
             self.timer_medicion.start(duracion * 1000)
 
     def on_data_received_rt(self, data):
-        if "pin32" in data and "pin35" in data and "timestamp" in data:
-            timestamp = data["timestamp"]
+        # Las muestras llegan por on_block_received_rt; acá solo quedan los mensajes de control
+        if "message" in data:
+            print(f"[ESP32] {data.get('type', '')}: {data['message']}")
+
+    def on_block_received_rt(self, bloque):
+        # Fila 0: timestamps en ms; después una fila por canal de self.canales_rt
+        timestamps, lecturas = bloque[0], bloque[1:]
 
-            # Establecer t0 una vez
-            if self.t0_rt is None:
-                self.t0_rt = timestamp
+        # Establecer t0 una vez
+        if self.t0_rt is None:
+            self.t0_rt = timestamps[0]
 
-            t = timestamp - self.t0_rt  # normalizar a partir de 0
+        t = timestamps - self.t0_rt  # normalizar a partir de 0
 
-            v_braquial = (data["pin32"] / 4095.0) * 3.3
-            v_tibial = (data["pin35"] / 4095.0) * 3.3
+        voltajes = (lecturas / 4095.0) * 3.3
 
-            self.timestamps_rt.append(timestamp / 1000)
-            self.braquial_vals_rt.append(v_braquial)
-            self.tibial_vals_rt.append(v_tibial)
+        self.buffer_rt.agregar(np.column_stack((timestamps / 1000, voltajes.T)))
+        if self.grabador_rt is not None:
+            self.grabador_rt.agregar(timestamps, voltajes)
 
-            # Usar el nuevo gráfico con PyQtGraph
-            self.graph_rt.update_plot(t, v_braquial, v_tibial)
+        # Usar el nuevo gráfico con PyQtGraph
+        self.graph_rt.update_block(t, *voltajes)
+
+        # La VOP en vivo y el análisis final usan el par braquial-tibial (los dos primeros canales)
+        if self.detector_rt is None:
+            self.crear_detector_rt()
+            return
+        v_braquial, v_tibial = voltajes[0], voltajes[1]
+        if self.detector_rt.procesar_bloque(t / 1000, v_braquial, v_tibial):
+            if self.detector_rt.vop is not None:
+                self.vop_box.setText(f"VOP (en vivo): {self.detector_rt.vop:.2f} m/s")
+            if self.detector_rt.fc is not None:
+                self.fc_box.setText(f"Frecuencia (en vivo): {self.detector_rt.fc:.0f} bpm")
+
+    def crear_detector_rt(self, segundos=2.0):
+        # Los filtros y promedios del detector dependen de fs: se estima la frecuencia real (el ESP32
+        # no manda a 200 Hz) con los últimos `segundos` de muestras y se le pasa todo lo acumulado.
+        # Al arrancar llegan ráfagas de muestras casi con el mismo ms que inflan la estimación, así
+        # que se espera a una ventana sin saltos menores a medio período
+        t_s, braquial, tibial = self.buffer_rt.vista()[:3]
+        if len(t_s) < 2 or t_s[-1] - t_s[0] < segundos:
+            return
+        ventana = t_s[np.searchsorted(t_s, t_s[-1] - segundos):] * 1000
+        saltos = np.diff(ventana)
+        if len(saltos) < 2 or saltos.min() < 0.5 * np.median(saltos):
+            return
+        _, fs_estimada = estimar_reloj(ventana)
+        if fs_estimada is None:
+            return
+        try:
+            self.detector_rt = DetectorPiesOnline(fs=fs_estimada, altura_cm=float(self.altura))
+        except (AttributeError, TypeError, ValueError):
+            self.detector_rt = DetectorPiesOnline(fs=fs_estimada)
+        print(f"Detector en vivo a {fs_estimada:.1f} Hz (estimada)")
+        self.detector_rt.procesar_bloque(t_s - self.t0_rt / 1000, braquial, tibial)
 
     def finalizar_medicion_rt(self):
         if self.websocket_thread:
@@ -95,14 +166,17 @@ class MainWindow(QWidget):
         self.iniciar_medicion_button.setText("Iniciar medición en tiempo real")
         self.iniciar_medicion_button.setEnabled(True)
         self.measuring = False
+        self.cerrar_grabador_rt()
+        self.graph_rt.refiltrar_fase_cero()
 
         try:
-            t_array = np.array(self.timestamps_rt)
-            b_array = np.array(self.braquial_vals_rt)
-            t_array_ = np.array(self.tibial_vals_rt)
+            # Copia de la sesión completa (memoria + desborde): el análisis corre en otro proceso
+            t_array, b_array, t_array_ = self.buffer_rt.historial()[:3]
             altura_cm = float(self.altura)  # Usar atributo de altura cargada
 
-            procesar_y_graficar(self, t_array, b_array, t_array_, altura_cm)
+            # Grilla uniforme de 200 Hz a partir del reloj estimado (ver Remuestreo)
+            t_ms, (b_array, t_array_), self.fs_estimada = remuestrear(t_array * 1000, (b_array, t_array_), fs=200)
+            procesar_y_graficar(self, (t_ms - t_ms[0]) / 1000, b_array, t_array_, altura_cm)
 
         except Exception as e:
             print(f"[ERROR procesamiento final] {e}")
@@ -111,17 +185,17 @@ class MainWindow(QWidget):
             self.cavi_box.setText("CAVI: --")
             self.report_button.setEnabled(False)
             self.export_image_button.setEnabled(False)
-        
-        # Guardar archivo de texto al finalizar
-        timestamp_str = datetime.now().strftime("%Y%m%d_M%H%M%S")
-        filename = f"mediciones_{timestamp_str}.txt"
-        try:
-            with open(filename, 'w') as f:
-                for line in self.logged_lines:
-                    f.write(line + '\n')
-            print(f"Archivo guardado: {filename}")
-        except Exception as e:
-            print(f"Error al guardar archivo: {e}")
+
+    def cerrar_grabador_rt(self):
+        # Termina de escribir lo encolado y cierra los archivos de la medición
+        if self.grabador_rt is None:
+            return
+        self.grabador_rt.cerrar()
+        for ruta in self.grabador_rt.rutas:
+            print(f"Archivo guardado: {ruta}")
+        if self.grabador_rt.bloques_descartados:
+            print(f"⚠️ {self.grabador_rt.bloques_descartados} bloques no se pudieron grabar")
+        self.grabador_rt = None
 
     def __init__(self):
         super().__init__()
@@ -129,11 +203,16 @@ class MainWindow(QWidget):
         self.setGeometry(50, 50, 1000, 500)
         self.websocket_thread = None
         self.measuring = False
-        """self.graph_rt = None"""  # Gráfico para medición en vivo
-        self.graph_rt = RealTimeGraph()
-        self.timestamps = []
-        self.braquial_vals_rt = []
-        self.tibial_vals_rt = []
+        """self.graph_rt = None"""  # Gráfico para medición en vivo (se crea en init_app)
+        # Canales que manda el ESP32, en orden (el par braquial-tibial siempre primero)
+        self.canales_rt = ("braquial", "tibial")
+        self.ejecutor_analisis = EjecutorAnalisis(self)
+        self.ejecutor_analisis.resultado_listo.connect(self.mostrar_analisis)
+        self.ejecutor_analisis.error.connect(self.error_analisis)
+        # Muestras de la medición en tiempo real (t en s y un canal por columna); lo que excede
+        # la capacidad pasa a un archivo temporal, así la sesión puede durar lo que haga falta
+        self.buffer_rt = BufferCircular(2**18, 1 + len(self.canales_rt), desborde=True)
+        self.grabador_rt = None
 
 
         palette = self.palette()
@@ -173,6 +252,7 @@ class MainWindow(QWidget):
         self.tibial_vals_raw = []
         self.braquial_vals_filt = []
         self.tibial_vals_filt = []
+        self.indice_tiempo = None
         
     def init_inicio(self):
         init_inicio(self) 
@@ -198,6 +278,19 @@ class MainWindow(QWidget):
     def update_plot_window(self, start_time):
         update_plot_window(self, start_time)
 
+    def mostrar_analisis(self, trabajo, resultado):
+        mostrar_analisis(self, trabajo, resultado)
+
+    def error_analisis(self, trabajo, mensaje):
+        error_analisis(self, trabajo, mensaje)
+
+    def closeEvent(self, event):
+        self.ejecutor_analisis.cerrar()
+        self.cerrar_grabador_rt()
+        self.graph_rt.cerrar()
+        self.buffer_rt.cerrar()
+        super().closeEvent(event)
+
     def exportar_hl7(self):
         exportar_hl7(self)
     
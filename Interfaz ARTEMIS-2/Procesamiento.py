@@ -1,21 +1,15 @@
 import sys
 import json
 import numpy as np
-import pandas as pd
-from scipy.signal import butter, filtfilt, find_peaks
+from scipy.signal import sosfiltfilt, find_peaks
+from Filtros import diseno_pasabajo, diseno_pasaaltos
 import random
 
 def lowpass_filter(signal, fs, cutoff=16, order=4):
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='low')
-    return filtfilt(b, a, signal)
+    return sosfiltfilt(diseno_pasabajo(fs, cutoff, order), signal)
 
 def highpass_filter(signal, fs, cutoff=0.5, order=4):
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='high')
-    return filtfilt(b, a, signal)
+    return sosfiltfilt(diseno_pasaaltos(fs, cutoff, order), signal)
 
 def normalize(signal):
     std_dev = np.std(signal)
@@ -26,63 +20,316 @@ def normalize(signal):
 def suavizar_senal(signal, ventana=5):
     return np.convolve(signal, np.ones(ventana)/ventana, mode='same')
 
+def preprocesar(senales, fs, ventana=5):
+    """
+    Preprocesamiento de todos los canales a la vez sobre un array 2-D (canales,
+    muestras): pasaaltos 0.5 Hz y pasabajo 16 Hz (filtfilt), normalización,
+    suavizado de `ventana` muestras y derivada. Da lo mismo que aplicar
+    highpass/lowpass_filter, normalize, suavizar_senal y np.gradient canal por
+    canal, pero con pocos arrays de trabajo en lugar de uno nuevo por paso.
 
-def calcular_vop(datos_json, altura_cm, fs):
-    df = pd.DataFrame(datos_json).dropna(subset=["t", "braquial", "tibial"])
-    t = (df["t"].astype(float).to_numpy() - df["t"].iloc[0]) / 1000.0
-    ba = df["braquial"].astype(float).to_numpy()
-    an = df["tibial"].astype(float).to_numpy()
-
-    ba_filt = lowpass_filter(highpass_filter(ba, fs), fs)
-    an_filt = lowpass_filter(highpass_filter(an, fs), fs)
-    ba_norm = normalize(ba_filt)
-    an_norm = normalize(an_filt)
-    ba_norm = suavizar_senal(ba_norm)
-    an_norm = suavizar_senal(an_norm)
-
-    ba_grad = np.gradient(ba_norm, 1 / fs)
-    an_grad = np.gradient(an_norm, 1 / fs)
-
-    grad_std_ba = np.std(ba_grad)
-    grad_std_an = np.std(an_grad)
-    ba_prominence = max(0.8 * grad_std_ba, 0.15)
-    an_prominence = max(0.7 * grad_std_an, 0.15)
-
-    foot_ba, _ = find_peaks(ba_grad, distance=fs * 0.2, prominence=ba_prominence)
-    foot_an, _ = find_peaks(an_grad, distance=fs * 0.2, prominence=an_prominence)
-
-    print(foot_ba)
-    print(foot_an)
-
-    ptt_list = []
-    for fb in foot_ba:
-        time_b = t[fb]
-        time_diffs = t[foot_an] - time_b
-        valid_indices = np.where(time_diffs > 0)[0]
-        if len(valid_indices) > 0:
-            pt = time_diffs[valid_indices[np.argmin(time_diffs[valid_indices])]]
-            if 0.12 <= pt <= 0.35:
-                ptt_list.append(pt)
-
-    if not ptt_list:
-        return [], None
+    Los dos filtros se aplican por separado y no como una sola cascada SOS: con
+    filtfilt cambian el relleno y las condiciones iniciales en los bordes, y eso
+    alteraba los pies detectados (y la VOP) en algunos registros de Señales/.
+
+    Returns:
+    tuple: (filtradas, derivadas), ambos de forma (canales, muestras).
+    """
+    x = np.atleast_2d(np.asarray(senales, dtype=float))
+    filtradas = sosfiltfilt(diseno_pasabajo(fs, 16), sosfiltfilt(diseno_pasaaltos(fs, 0.5), x, axis=1), axis=1)
+    n = filtradas.shape[1]
+
+    # Normalización (media 0, desvío 1) en un buffer de trabajo
+    normalizadas = filtradas - filtradas.mean(axis=1, keepdims=True)
+    desvio = filtradas.std(axis=1, keepdims=True)
+    np.divide(normalizadas, desvio, out=normalizadas, where=desvio != 0)
+
+    # Media móvil centrada con ceros en los bordes (como np.convolve(mode='same'))
+    suavizadas = np.zeros_like(normalizadas)
+    mitad = ventana // 2
+    for k in range(ventana):
+        desde = k - (ventana - 1 - mitad)
+        if desde < 0:
+            suavizadas[:, -desde:] += normalizadas[:, :n + desde]
+        else:
+            suavizadas[:, :n - desde] += normalizadas[:, desde:]
+    suavizadas /= ventana
+
+    # Derivada (diferencias centradas, de un lado en los bordes) reutilizando el buffer normalizado
+    derivadas = normalizadas
+    if n > 1:
+        np.subtract(suavizadas[:, 2:], suavizadas[:, :-2], out=derivadas[:, 1:-1])
+        derivadas[:, 1:-1] *= fs / 2.0
+        derivadas[:, 0] = (suavizadas[:, 1] - suavizadas[:, 0]) * fs
+        derivadas[:, -1] = (suavizadas[:, -1] - suavizadas[:, -2]) * fs
+    else:
+        derivadas[:] = 0
+    return filtradas, derivadas
+
+# Motivos de descarte de cada pie braquial al emparejarlo con un pie tibial
+PTT_VALIDO = 0
+PTT_SIN_TIBIAL = 1
+PTT_FUERA_DE_RANGO = 2
+
+def emparejar_pies(t_braquial, t_tibial, ptt_min=0.12, ptt_max=0.35):
+    """
+    Empareja cada pie braquial con el primer pie tibial estrictamente posterior,
+    en una sola pasada vectorizada (searchsorted sobre los tiempos tibiales ordenados).
 
+    Returns:
+    tuple: (ptt, idx_braquial, idx_tibial, motivo), un elemento por pie braquial.
+    ptt vale NaN e idx_tibial -1 cuando no hay pie tibial posterior; motivo es
+    PTT_VALIDO, PTT_SIN_TIBIAL o PTT_FUERA_DE_RANGO.
+    """
+    t_braquial = np.asarray(t_braquial, dtype=float)
+    t_tibial = np.asarray(t_tibial, dtype=float)
+    n = len(t_braquial)
+
+    orden = np.argsort(t_tibial, kind='stable')
+    t_tibial_ord = t_tibial[orden]
+    pos = np.searchsorted(t_tibial_ord, t_braquial, side='right')
+    con_par = pos < len(t_tibial_ord)
+
+    idx_tibial = np.full(n, -1, dtype=np.intp)
+    idx_tibial[con_par] = orden[pos[con_par]]
+    ptt = np.full(n, np.nan)
+    ptt[con_par] = t_tibial_ord[pos[con_par]] - t_braquial[con_par]
+
+    motivo = np.full(n, PTT_VALIDO, dtype=np.int8)
+    motivo[~con_par] = PTT_SIN_TIBIAL
+    motivo[con_par & ((ptt < ptt_min) | (ptt > ptt_max))] = PTT_FUERA_DE_RANGO
+    return ptt, np.arange(n), idx_tibial, motivo
+
+
+def distancia_arterial(altura_cm):
+    # Distancia recorrida por la onda (m) estimada a partir de la altura
     Dhb = (0.220 * altura_cm - 2.07) / 100
     Dhf = (0.564 * altura_cm - 18.4) / 100
     Dfa = (0.249 * altura_cm + 30.7) / 100
-    distancia = Dfa + Dhf - Dhb
-    vop = [distancia / i for i in ptt_list if 0 < i and distancia / i < 25]
+    return Dfa + Dhf - Dhb
+
+
+def calcular_vop(datos_json, altura_cm, fs):
+    # API de compatibilidad: lista de dicts {"t" (ms), "braquial", "tibial"}
+    datos = np.array(
+        [[d.get("t"), d.get("braquial"), d.get("tibial")] for d in datos_json], dtype=float
+    ).reshape(-1, 3)
+    datos = datos[np.isfinite(datos).all(axis=1)]
+    if len(datos) == 0:
+        return [], None
+    t = (datos[:, 0] - datos[0, 0]) / 1000.0
+    return calcular_vop_arrays(t, datos[:, 1], datos[:, 2], altura_cm, fs)
+
+
+# Umbral de los pies: picos de la derivada con prominencia mayor a k·std(derivada) (y a 0.15).
+# k por canal; los canales sin valor propio (sitios distales) usan FACTOR_UMBRAL_DEFECTO.
+FACTOR_UMBRAL = {"braquial": 0.8, "tibial": 0.7}
+FACTOR_UMBRAL_DEFECTO = 0.7
+
+# Refinamiento sub-muestra de los pies (a 200 Hz una muestra son 5 ms, mucho frente a un PTT de 120-350 ms)
+REFINAMIENTOS = (None, "parabola", "tangente")
+
+def refinar_pies(senal, derivada, pies, fs, metodo="parabola", ventana_s=0.25):
+    """
+    Ubica los pies con resolución menor a una muestra, todos a la vez.
+
+    Parameters:
+    senal (array): Señal filtrada del canal (para el método de la tangente).
+    derivada (array): Derivada en la que se detectaron los pies (máximos).
+    pies (array): Índices enteros de los máximos de la derivada.
+    metodo (str): "parabola": vértice de la parábola que pasa por el máximo de la
+        derivada y sus dos vecinos (mismo criterio de pie, sin cuantizar).
+        "tangente": intersección de la tangente en el punto de máxima pendiente con
+        la horizontal del mínimo local previo (donde la derivada deja de ser
+        positiva, buscado hasta ventana_s segundos antes).
+
+    Returns:
+    array: Posición de cada pie en muestras (float).
+    """
+    pies = np.asarray(pies, dtype=np.intp)
+    posiciones = pies.astype(float)
+    if metodo is None or len(pies) == 0 or len(derivada) < 3:
+        return posiciones
+    if metodo not in REFINAMIENTOS:
+        raise ValueError(f"Refinamiento desconocido: {metodo!r}")
+
+    i = np.clip(pies, 1, len(derivada) - 2)
+    izq, centro, der = derivada[i - 1], derivada[i], derivada[i + 1]
+    curvatura = izq - 2 * centro + der
+    desplazamiento = np.zeros(len(i))
+    np.divide(0.5 * (izq - der), curvatura, out=desplazamiento, where=curvatura < 0)
+    desplazamiento = np.clip(desplazamiento, -0.5, 0.5)
+    desplazamiento[i != pies] = 0  # los máximos en el borde quedan donde están
+    posiciones += desplazamiento
+    if metodo == "parabola":
+        return posiciones
+
+    # Tangente: y(p) + pendiente·(x - p) = mínimo previo, con p el máximo de la derivada ya refinado
+    ancho = max(int(ventana_s * fs), 1)
+    anteriores = np.clip(pies[:, None] - np.arange(ancho + 1), 0, None)
+    no_crece = derivada[anteriores] <= 0
+    j = np.where(no_crece.any(axis=1), no_crece.argmax(axis=1), ancho)
+    minimos = senal[anteriores[np.arange(len(pies)), j]]
+    pendiente = 0.5 * (senal[i + 1] - senal[i - 1])  # por muestra
+    valor = np.interp(posiciones, np.arange(len(senal)), senal)
+    tangente = posiciones.copy()
+    np.subtract(posiciones, (valor - minimos) / np.where(pendiente > 0, pendiente, 1), out=tangente, where=pendiente > 0)
+    return np.clip(tangente, anteriores[:, -1], posiciones)
+
+def tiempos_de_indices(t, pies):
+    # Tiempo de cada pie, interpolando t para las posiciones fraccionarias
+    return np.interp(pies, np.arange(len(t)), t) if len(t) else np.empty(0)
+
+def detectar_pies_canal(filtrada, derivada, fs, nombre="braquial", refinamiento="parabola"):
+    # Máximos de la derivada por encima del umbral del canal, refinados si se pide
+    prominencia = max(FACTOR_UMBRAL.get(nombre, FACTOR_UMBRAL_DEFECTO) * np.std(derivada), 0.15)
+    idx, _ = find_peaks(derivada, distance=fs * 0.2, prominence=prominencia)
+    return refinar_pies(filtrada, derivada, idx, fs, refinamiento) if refinamiento else idx
+
+def detectar_pies_multicanal(t, senales, fs, canales=None, filt_out=None, refinamiento="parabola"):
+    """
+    Detecta los pies de onda de todos los canales de un registro en una sola pasada
+    de preprocesamiento.
 
-    print(ptt_list)
+    Parameters:
+    t (array): Tiempos en segundos, forma (n,).
+    senales (array): Una fila por canal, forma (canales, n).
+    canales (sequence): Nombres de los canales (para FACTOR_UMBRAL); por defecto se
+        asume ("braquial", "tibial", ...).
+    filt_out (array): Opcional, (canales, n) donde se escriben las señales filtradas;
+        las muestras descartadas quedan en NaN.
+    refinamiento (str): Método de refinar_pies (None deja los índices enteros).
 
-    times_brachial = t[foot_ba]
-    rr_intervals = np.diff(times_brachial)
-    valid_rr = rr_intervals[(rr_intervals > 0.5) & (rr_intervals < 1.2)]
+    Returns:
+    tuple: (t_validos, pies), con t_validos los tiempos (desde 0) de las muestras
+    usadas y pies una lista con la posición (en muestras, float si se refinó) de los
+    pies de cada canal en t_validos; tiempos_de_indices los pasa a segundos.
+    """
+    t = np.ascontiguousarray(t, dtype=float)
+    senales = np.atleast_2d(np.asarray(senales, dtype=float))
+    if canales is None:
+        canales = ("braquial", "tibial") + tuple(f"canal_{i}" for i in range(2, len(senales)))
+
+    validos = np.isfinite(t) & np.isfinite(senales).all(axis=0)
+    if not validos.all():
+        t, senales = t[validos], senales[:, validos]
+    if len(t) == 0:
+        return t, [np.empty(0, dtype=np.intp) for _ in canales]
+    t = t - t[0]
+
+    filtradas, derivadas = preprocesar(senales, fs)
+    if filt_out is not None:
+        for salida, filtrada in zip(filt_out, filtradas):
+            salida[~validos] = np.nan
+            salida[validos] = filtrada
+
+    pies = [
+        detectar_pies_canal(filtrada, derivada, fs, nombre, refinamiento)
+        for nombre, filtrada, derivada in zip(canales, filtradas, derivadas)
+    ]
+    return t, pies
+
+def calcular_ptt_pares(t, senales, fs, pares, canales=None, ptt_min=0.12, ptt_max=0.35,
+                       ventanas=None, filt_out=None, refinamiento="parabola"):
+    """
+    PTT de varios pares de canales (proximal, distal) a partir de un solo preprocesamiento.
 
-    print(valid_rr)
+    Parameters:
+    pares (sequence): Pares de índices de fila (proximal, distal) de `senales`.
+    ventanas (sequence): Opcional, (ptt_min, ptt_max) de cada par; por defecto todos usan
+        ptt_min/ptt_max (pensados para braquial-tibial).
 
-    freq_bpm = (1 / np.median(valid_rr)) * 60 if len(valid_rr) > 0 else random.randint(65, 75)
-    if freq_bpm > 75 or freq_bpm < 65:
+    Returns:
+    tuple: (ptt_pares, t_validos, pies), con ptt_pares una lista (un array de PTT
+    válidos en s por par) y t_validos/pies como en detectar_pies_multicanal.
+    """
+    t, pies = detectar_pies_multicanal(t, senales, fs, canales, filt_out, refinamiento)
+    tiempos = [tiempos_de_indices(t, p) for p in pies]
+    ptt_pares = []
+    if ventanas is None:
+        ventanas = [(ptt_min, ptt_max)] * len(pares)
+    for (proximal, distal), (minimo, maximo) in zip(pares, ventanas):
+        ptt, _, _, motivo = emparejar_pies(tiempos[proximal], tiempos[distal], minimo, maximo)
+        ptt_pares.append(ptt[motivo == PTT_VALIDO])
+    return ptt_pares, t, pies
+
+def calcular_vop_multicanal(t, senales, canales, fs, distancias, pares=None, ventanas=None,
+                            refinamiento="parabola"):
+    """
+    VOP de cada par de sitios (carótida-femoral, braquial-tibial, etc.) en una pasada.
+
+    Parameters:
+    canales (sequence): Nombre de cada fila de `senales`.
+    distancias (dict): Distancia recorrida (m) por par de nombres, {(proximal, distal): m}.
+    pares (sequence): Pares de nombres a calcular; por defecto, los de `distancias`.
+    ventanas (dict): Opcional, {(proximal, distal): (ptt_min, ptt_max)} para los pares
+        cuyo PTT no cae en la ventana braquial-tibial (0.12-0.35 s).
+
+    Returns:
+    dict: {(proximal, distal): {"vop", "ptt", "n_ptt"}}, con vop y ptt (medianas) en None
+    si el par no tuvo PTT válidos.
+    """
+    canales = list(canales)
+    pares = list(distancias) if pares is None else list(pares)
+    indices = [(canales.index(a), canales.index(b)) for a, b in pares]
+    ventanas = ventanas or {}
+    ptt_pares, _, _ = calcular_ptt_pares(
+        t, senales, fs, indices, canales, ventanas=[ventanas.get(par, (0.12, 0.35)) for par in pares],
+        refinamiento=refinamiento
+    )
+
+    resultado = {}
+    for par, ptt in zip(pares, ptt_pares):
+        ptt = ptt[ptt > 0]
+        mediana = float(np.median(ptt)) if len(ptt) else None
+        distancia = distancias.get(par)
+        vop = distancia / mediana if mediana and distancia is not None else None
+        resultado[par] = {"vop": vop, "ptt": mediana, "n_ptt": len(ptt)}
+    return resultado
+
+
+def frecuencia_cardiaca(t, pies, rr_min=0.5, rr_max=1.2):
+    """
+    Frecuencia cardíaca medida (bpm): mediana de los intervalos RR entre pies que caen
+    entre rr_min y rr_max segundos. None si no hay ninguno.
+    """
+    rr_intervals = np.diff(tiempos_de_indices(t, pies))
+    valid_rr = rr_intervals[(rr_intervals > rr_min) & (rr_intervals < rr_max)]
+    if len(valid_rr) == 0:
+        return None
+    return float((1 / np.median(valid_rr)) * 60)
+
+def _vop_y_frecuencia(t, braquial, tibial, altura_cm, fs, filt_out=None, refinamiento="parabola"):
+    # (lista de VOP en m/s, frecuencia medida en bpm o None), sin valores de relleno
+    (ptt,), t, (foot_ba, foot_an) = calcular_ptt_pares(
+        t, np.vstack((braquial, tibial)), fs, [(0, 1)], ("braquial", "tibial"), filt_out=filt_out,
+        refinamiento=refinamiento
+    )
+    distancia = distancia_arterial(altura_cm)
+    vop = [distancia / i for i in ptt.tolist() if 0 < i and distancia / i < 25]
+    return vop, frecuencia_cardiaca(t, foot_ba)
+
+def calcular_vop_arrays(t, braquial, tibial, altura_cm, fs, filt_out=None, refinamiento="parabola"):
+    """
+    Calcula la VOP y la frecuencia cardíaca a partir de arrays de NumPy.
+
+    Parameters:
+    t (array): Tiempos en segundos.
+    braquial, tibial (array): Señales de cada canal, misma longitud que t.
+    filt_out (tuple): Opcional, par de arrays preasignados (len(t)) donde se escriben
+        las señales braquial y tibial filtradas; las muestras descartadas quedan en NaN.
+    refinamiento (str): Ubicación sub-muestra de los pies (ver refinar_pies).
+
+    Returns:
+    tuple: (lista de VOP en m/s, frecuencia en bpm) o ([], None) si no hay PTT válidos.
+    La frecuencia que muestra la GUI cae a un valor entre 65 y 75 si la medida no está
+    en ese rango; para el valor medido usar analizar_senales.
+    """
+    vop, freq_bpm = _vop_y_frecuencia(t, braquial, tibial, altura_cm, fs, filt_out, refinamiento)
+    if not vop:
+        return [], None
+
+    if freq_bpm is None or freq_bpm > 75 or freq_bpm < 65:
         freq_bpm = random.randint(65, 75)
     return vop, freq_bpm
 
@@ -190,3 +437,24 @@ def calcular_cavi(pwv, sbp, dbp):
         return None # Handle case where SBP == DBP
     except ValueError:
         return None # Handle log of non-positive numbers or other math errors
+
+
+def analizar_senales(t, braquial, tibial, altura_cm, fs, sistolica=None, diastolica=None,
+                     refinamiento="parabola"):
+    """
+    Pipeline completo sin GUI: VOP (mediana), frecuencia cardíaca y CAVI.
+
+    Returns:
+    dict: {"vop", "fc", "cavi", "n_ptt", "metodo"}; vop, fc y cavi valen None si no se
+    pudieron calcular. fc es la medida (mediana de los RR braquiales), sin el valor de
+    relleno de la GUI; metodo es siempre "latidos" (ver PromedioLatidos).
+    """
+    vop_list, freq_bpm = _vop_y_frecuencia(t, braquial, tibial, altura_cm, fs, refinamiento=refinamiento)
+    resultado = {"vop": None, "fc": freq_bpm, "cavi": None, "n_ptt": len(vop_list), "metodo": "latidos"}
+    if not vop_list:
+        return resultado
+    resultado["vop"] = float(np.median(vop_list))
+    if sistolica is not None and diastolica is not None:
+        cavi = calcular_cavi(resultado["vop"], sistolica, diastolica)
+        resultado["cavi"] = float(cavi) if cavi is not None else None
+    return resultado
@@ -0,0 +1,230 @@
+import numpy as np
+from Procesamiento import (
+    preprocesar, detectar_pies_canal, refinar_pies, calcular_ptt_pares, frecuencia_cardiaca, distancia_arterial,
+    calcular_cavi
+)
+
+# Promediado de latidos (ensemble averaging): en lugar de un PTT por latido, se recortan
+# todos los latidos alineados en el pie braquial, se descartan los que no se parecen al
+# resto y se mide un solo PTT entre las plantillas promedio de cada canal. El ruido baja
+# con la raíz de la cantidad de latidos y el pie se busca una sola vez por canal.
+
+
+def segmentar_latidos(senales, pies, antes, despues):
+    """
+    Recorta un latido por pie, de todos los canales, alineado en el pie con
+    resolución sub-muestra (interpolación lineal).
+
+    Parameters:
+    senales (array): Una fila por canal, forma (canales, n).
+    pies (array): Posición de cada pie en muestras (puede ser fraccionaria).
+    antes, despues (int): Muestras a tomar antes y después del pie.
+
+    Returns:
+    tuple: (latidos, usados), con latidos de forma (canales, latidos, antes + despues)
+    y usados los índices (en `pies`) de los latidos que entraron completos.
+    """
+    senales = np.atleast_2d(np.asarray(senales, dtype=float))
+    pies = np.asarray(pies, dtype=float)
+    base = np.floor(pies).astype(np.intp)
+    usados = np.flatnonzero((base - antes >= 0) & (base + despues <= senales.shape[1] - 1))
+    base = base[usados]
+    fraccion = (pies[usados] - base)[:, None]
+    idx = base[:, None] + np.arange(-antes, despues)
+    latidos = senales[:, idx] * (1 - fraccion) + senales[:, idx + 1] * fraccion
+    return latidos, usados
+
+def rechazar_latidos(latidos, fraccion=0.5, correlacion_min=0.0, k_mad=3.0, canal=0):
+    """
+    Marca los latidos que se conservan para la plantilla.
+
+    La forma se juzga solo en el canal de alineación (`canal`, el braquial): la
+    correlación de cada latido con la mediana de los latidos tiene que estar en la
+    mejor `fraccion` y ser mayor a correlacion_min. Un umbral absoluto no sirve con
+    los registros reales, en los que la correlación braquial típica anda en 0.4-0.6
+    y la tibial, alineada en el pie braquial, es casi nula. En todos los canales se
+    descarta además el latido cuya amplitud (desvío) se aparta más de k_mad desvíos
+    robustos de la mediana (artefactos de movimiento).
+
+    Returns:
+    array: Máscara booleana de forma (latidos,).
+    """
+    centrados = latidos - latidos.mean(axis=2, keepdims=True)
+    forma = centrados[canal]
+    mediana = np.median(forma, axis=0)
+    producto = forma @ mediana
+    normas = np.sqrt((forma ** 2).sum(axis=1) * (mediana ** 2).sum())
+    correlacion = np.zeros_like(producto)
+    np.divide(producto, normas, out=correlacion, where=normas > 0)
+    umbral = max(correlacion_min, np.quantile(correlacion, 1 - fraccion))
+
+    amplitud = centrados.std(axis=2)
+    amplitud_mediana = np.median(amplitud, axis=1, keepdims=True)
+    desvio = np.abs(amplitud - amplitud_mediana)
+    mad = 1.4826 * np.median(desvio, axis=1, keepdims=True)
+    amplitud_ok = ((mad == 0) | (desvio <= k_mad * mad)).all(axis=0)
+    return (correlacion >= umbral) & amplitud_ok
+
+def realinear_pies(senal, pies, plantilla, antes, despues, max_desplazamiento):
+    """
+    Corrige la posición de cada pie con el desplazamiento (hasta ±max_desplazamiento
+    muestras, sub-muestra por interpolación parabólica) que maximiza la correlación
+    del latido con la plantilla. Alinear con todo el latido y no solo con el máximo
+    de la derivada evita que el ruido de cada pie afine artificialmente la plantilla.
+
+    Returns:
+    array: Pies corregidos (muestras, float); los que no entran completos quedan igual.
+    """
+    pies = np.asarray(pies, dtype=float)
+    plantilla = plantilla - plantilla.mean()
+    desplazamientos = np.arange(-max_desplazamiento, max_desplazamiento + 1)
+    puntajes = np.full((len(desplazamientos), len(pies)), -np.inf)
+    for fila, k in zip(puntajes, desplazamientos):
+        latidos, usados = segmentar_latidos(senal, pies + k, antes, despues)
+        latidos = latidos[0] - latidos[0].mean(axis=1, keepdims=True)
+        fila[usados] = latidos @ plantilla
+
+    mejor = np.clip(np.argmax(puntajes, axis=0), 1, len(desplazamientos) - 2)
+    columnas = np.arange(len(pies))
+    izq, centro, der = puntajes[mejor - 1, columnas], puntajes[mejor, columnas], puntajes[mejor + 1, columnas]
+    completos = np.isfinite(izq) & np.isfinite(der)
+    curvatura = np.where(completos, izq - 2 * centro + der, 0.0)
+    ajuste = np.zeros(len(pies))
+    np.divide(0.5 * (izq - der), curvatura, out=ajuste, where=completos & (curvatura < 0))
+    correccion = desplazamientos[mejor] + np.clip(ajuste, -0.5, 0.5)
+    return np.where(completos, pies + correccion, pies)
+
+
+def calcular_ptt_promediado(t, braquial, tibial, fs, antes_s=0.1, despues_s=0.5, ptt_min=0.12, ptt_max=0.35,
+                            refinamiento="tangente", fraccion=0.8, min_latidos=8, z_min=4.0):
+    """
+    PTT braquial-tibial medido sobre las plantillas promedio de los latidos.
+
+    Los latidos se alinean en los pies braquiales (mismo detector que calcular_vop),
+    así que en la plantilla braquial el pie queda en antes_s y el tibial se busca
+    entre ptt_min y ptt_max después. Para alinear solo se usan los pies con pendiente
+    de al menos la mitad del percentil 90: el detector también marca la onda dícrota
+    y picos de ruido, y mezclarlos arruinaría la plantilla. Después de una primera
+    plantilla, cada latido se realinea por correlación (realinear_pies) y se promedia
+    de nuevo. Los latidos que cruzan un hueco del registro (muestras no finitas
+    descartadas) no se usan.
+
+    Si quedan menos de min_latidos latidos para promediar, o en la plantilla tibial
+    no hay un pie claro dentro de la ventana, se devuelve la mediana de los PTT
+    latido a latido (calcular_ptt_pares) y metodo vale "latidos". El pie tibial es
+    claro si la pendiente de la plantilla supera z_min errores estándar (desvío
+    entre latidos / raíz de la cantidad) y el PTT refinado cae en la ventana: en
+    registros donde la onda tibial no es coherente con el pie braquial, la
+    plantilla sale casi plana y su máximo de pendiente es ruido.
+
+    Returns:
+    dict: ptt (s, None si no se pudo medir), metodo ("promedio" o "latidos"),
+    plantillas (2, muestras), t_plantilla (s, relativo al pie braquial), n_latidos
+    (usados), n_descartados y fc (bpm, Procesamiento.frecuencia_cardiaca sobre los pies
+    braquiales, igual que analizar_senales; None si no hay RR válidos).
+    """
+    t = np.ascontiguousarray(t, dtype=float)
+    senales = np.vstack((braquial, tibial)).astype(float)
+    resultado = {"ptt": None, "metodo": "promedio", "plantillas": None, "t_plantilla": None, "n_latidos": 0,
+                 "n_descartados": 0, "fc": None}
+
+    validos = np.isfinite(t) & np.isfinite(senales).all(axis=0)
+    if not validos.all():
+        t, senales = t[validos], senales[:, validos]
+    antes, despues = int(round(antes_s * fs)), int(round(despues_s * fs))
+    if len(t) <= antes + despues:
+        return resultado
+    if _plantillas_y_ptt(resultado, t, senales, fs, antes, despues, ptt_min, ptt_max, refinamiento, fraccion,
+                         min_latidos, z_min):
+        return resultado
+
+    # Respaldo: mediana de los PTT latido a latido
+    resultado["metodo"], resultado["n_descartados"] = "latidos", 0
+    (ptt,), _, _ = calcular_ptt_pares(t, senales, fs, [(0, 1)], ptt_min=ptt_min, ptt_max=ptt_max,
+                                      refinamiento=refinamiento)
+    resultado["n_latidos"] = len(ptt)
+    if len(ptt):
+        resultado["ptt"] = float(np.median(ptt))
+    return resultado
+
+def _plantillas_y_ptt(resultado, t, senales, fs, antes, despues, ptt_min, ptt_max, refinamiento, fraccion,
+                      min_latidos, z_min):
+    """
+    Parte de calcular_ptt_promediado que trabaja sobre las plantillas; completa
+    `resultado` y devuelve False si el PTT no se pudo medir por promediado.
+    """
+    filtradas, derivadas = preprocesar(senales, fs)
+    pies = detectar_pies_canal(filtradas[0], derivadas[0], fs, "braquial", "parabola")
+    if len(pies) == 0:
+        return False
+    resultado["fc"] = frecuencia_cardiaca(t, pies)
+    pendientes = derivadas[0, np.rint(pies).astype(np.intp)]
+    pies = pies[pendientes >= 0.5 * np.percentile(pendientes, 90)]
+
+    latidos, usados = segmentar_latidos(filtradas, pies, antes, despues)
+    inicio = np.floor(pies[usados]).astype(np.intp) - antes
+    continuos = np.abs(t[inicio + antes + despues] - t[inicio] - (antes + despues) / fs) < 1.5 / fs
+    pies, latidos = pies[usados[continuos]], latidos[:, continuos]
+    if latidos.shape[1] < min_latidos:
+        return False
+
+    conservar = rechazar_latidos(latidos, fraccion)
+    if conservar.any():
+        plantilla = latidos[0, conservar].mean(axis=0)
+        pies = realinear_pies(filtradas[0], pies, plantilla, antes, despues, max(int(0.03 * fs), 1))
+        latidos, usados = segmentar_latidos(filtradas, pies, antes, despues)
+        conservar = conservar[usados]
+    resultado["n_latidos"] = int(conservar.sum())
+    resultado["n_descartados"] = int(len(conservar) - conservar.sum())
+    if resultado["n_latidos"] < min_latidos:
+        return False
+    plantillas = latidos[:, conservar].mean(axis=1)
+    resultado["plantillas"] = plantillas
+    resultado["t_plantilla"] = (np.arange(plantillas.shape[1]) - antes) / fs
+
+    # Pie de cada plantilla: máximo de la derivada (braquial cerca de `antes`, tibial en la ventana de PTT)
+    derivada = np.gradient(plantillas, 1 / fs, axis=1)
+    margen = max(int(0.05 * fs), 1)
+    desde_b = max(antes - margen, 1)
+    i_b = desde_b + np.argmax(derivada[0, desde_b:antes + margen + 1])
+    desde_t = antes + int(ptt_min * fs)
+    hasta_t = min(antes + int(np.ceil(ptt_max * fs)), plantillas.shape[1] - 2)
+    if hasta_t <= desde_t:
+        return False
+    i_t = desde_t + np.argmax(derivada[1, desde_t:hasta_t + 1])
+    if i_t in (desde_t, hasta_t):
+        return False  # el máximo quedó en el borde: no hay un pie tibial dentro de la ventana
+    pendientes = np.gradient(latidos[1, conservar], 1 / fs, axis=1)[:, i_t]
+    error = pendientes.std() / np.sqrt(len(pendientes))
+    if derivada[1, i_t] < z_min * error:
+        return False
+
+    pie_b = refinar_pies(plantillas[0], derivada[0], [i_b], fs, refinamiento)[0]
+    pie_t = refinar_pies(plantillas[1], derivada[1], [i_t], fs, refinamiento)[0]
+    ptt = (pie_t - pie_b) / fs
+    if not ptt_min <= ptt <= ptt_max:
+        return False
+    resultado["ptt"] = float(ptt)
+    return True
+
+def analizar_senales_promediado(t, braquial, tibial, altura_cm, fs, sistolica=None, diastolica=None,
+                                refinamiento="tangente"):
+    """
+    Igual que Procesamiento.analizar_senales, pero con el PTT de las plantillas
+    promedio. n_ptt es la cantidad de latidos promediados (o de PTT, si se usó el
+    respaldo latido a latido) y metodo indica cuál de los dos dio el PTT.
+
+    Returns:
+    dict: {"vop", "fc", "cavi", "n_ptt", "metodo"}; vop, fc y cavi valen None si no se
+    pudieron calcular.
+    """
+    promedio = calcular_ptt_promediado(t, braquial, tibial, fs, refinamiento=refinamiento)
+    resultado = {"vop": None, "fc": promedio["fc"], "cavi": None, "n_ptt": promedio["n_latidos"],
+                 "metodo": promedio["metodo"]}
+    if not promedio["ptt"] or promedio["ptt"] <= 0:
+        return resultado
+    resultado["vop"] = distancia_arterial(altura_cm) / promedio["ptt"]
+    if sistolica is not None and diastolica is not None:
+        cavi = calcular_cavi(resultado["vop"], sistolica, diastolica)
+        resultado["cavi"] = float(cavi) if cavi is not None else None
+    return resultado
@@ -0,0 +1,84 @@
+import struct
+import numpy as np
+
+# Trama binaria de muestras del ESP32 (little-endian):
+#   cabecera: magic "AR" | versión (u8) | canales (u8) | muestras (u16) | secuencia (u32)
+#   muestra:  timestamp en µs (u32) | canales de 12 bits empaquetados de a dos en 3 bytes
+# El timestamp es micros() desde el inicio de la medición y da la vuelta cada 2**32 µs (~71.6 min).
+MAGIC = b"AR"
+VERSION = 1
+CABECERA = struct.Struct("<2sBBHI")
+VUELTA_US = 2 ** 32
+
+
+def es_trama_binaria(mensaje):
+    return isinstance(mensaje, (bytes, bytearray)) and mensaje[:2] == MAGIC
+
+
+def decodificar_trama(mensaje):
+    """
+    Decodifica una trama binaria sin copiar los datos crudos (np.frombuffer).
+
+    Returns:
+    tuple: (secuencia, t_us, valores) con t_us de forma (n,) en µs y valores
+    de forma (n, canales) con las lecturas del ADC (0-4095).
+    """
+    magic, version, n_canales, n_muestras, secuencia = CABECERA.unpack_from(mensaje)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Trama binaria no soportada (magic={magic!r}, versión={version})")
+
+    n_bytes = (3 * n_canales + 1) // 2
+    tipo = np.dtype([("t", "<u4"), ("p", "u1", (n_bytes,))])
+    muestras = np.frombuffer(mensaje, dtype=tipo, count=n_muestras, offset=CABECERA.size)
+
+    # Completar a múltiplo de 3 bytes para desempaquetar los pares de 12 bits juntos
+    n_pares = (n_canales + 1) // 2
+    p = np.zeros((n_muestras, n_pares * 3), dtype=np.uint16)
+    p[:, :n_bytes] = muestras["p"]
+    p = p.reshape(n_muestras, n_pares, 3)
+    valores = np.empty((n_muestras, n_pares * 2), dtype=np.uint16)
+    valores[:, 0::2] = p[:, :, 0] | ((p[:, :, 1] & 0x0F) << 8)
+    valores[:, 1::2] = (p[:, :, 1] >> 4) | (p[:, :, 2] << 4)
+    return secuencia, muestras["t"], valores[:, :n_canales]
+
+
+def desenrollar_tiempos(t_us, anterior=None):
+    """
+    Pasa los timestamps u32 de una trama a µs crecientes (int64), sumando VUELTA_US
+    cada vez que el contador da la vuelta.
+
+    Parameters:
+    anterior (int): Último timestamp ya desenrollado de la trama previa de la misma
+        medición, o None en la primera trama.
+    """
+    t = np.asarray(t_us).astype(np.int64)
+    if len(t) == 0:
+        return t
+    if anterior is None:
+        previo, base = t[0], 0
+    else:
+        previo = anterior % VUELTA_US
+        base = anterior - previo
+    saltos = np.diff(t, prepend=previo)
+    vueltas = np.cumsum(saltos < -VUELTA_US // 2)
+    return t + base + vueltas * VUELTA_US
+
+
+def codificar_trama(secuencia, t_us, valores):
+    """Inversa de decodificar_trama (la usan las herramientas de prueba del lado PC)."""
+    valores = np.asarray(valores, dtype=np.uint16).reshape(len(t_us), -1) & 0x0FFF
+    n_muestras, n_canales = valores.shape
+    n_bytes = (3 * n_canales + 1) // 2
+    n_pares = (n_canales + 1) // 2
+
+    pares = np.zeros((n_muestras, n_pares * 2), dtype=np.uint16)
+    pares[:, :n_canales] = valores
+    p = np.empty((n_muestras, n_pares, 3), dtype=np.uint8)
+    p[:, :, 0] = pares[:, 0::2] & 0xFF
+    p[:, :, 1] = (pares[:, 0::2] >> 8) | ((pares[:, 1::2] & 0x0F) << 4)
+    p[:, :, 2] = pares[:, 1::2] >> 4
+
+    muestras = np.empty(n_muestras, dtype=np.dtype([("t", "<u4"), ("p", "u1", (n_bytes,))]))
+    muestras["t"] = np.asarray(t_us, dtype=np.uint64) & 0xFFFFFFFF
+    muestras["p"] = p.reshape(n_muestras, -1)[:, :n_bytes]
+    return CABECERA.pack(MAGIC, VERSION, n_canales, n_muestras, secuencia & 0xFFFFFFFF) + muestras.tobytes()
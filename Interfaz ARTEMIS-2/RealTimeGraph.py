@@ -1,24 +1,48 @@
 from pyqtgraph import PlotWidget, mkPen
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
-from collections import deque
 import numpy as np
-from scipy.signal import iirnotch, filtfilt, butter
+from scipy.signal import sosfiltfilt
+from Filtros import FiltroStreaming, diseno_notch, diseno_pasabajo
+from Decimacion import decimar
+from BufferCircular import BufferCircular
    
+# Columnas de RealTimeGraph.muestras: t, las crudas de cada canal y después las filtradas
+# (con los dos canales por defecto quedan T, BRAQUIAL, TIBIAL, BRAQUIAL_FILT, TIBIAL_FILT)
+T, BRAQUIAL, TIBIAL, BRAQUIAL_FILT, TIBIAL_FILT = range(5)
+
+CANALES = ("Braquial", "Tibial")
+COLORES = ('r', 'b', 'g', 'm', 'c', 'k')
+
 
 class RealTimeGraph(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, streaming=True, capacidad=2**16, canales=CANALES):
         super().__init__(parent)
+        self.canales = tuple(canales)
+        n = len(self.canales)
+        self.cols_crudas = np.arange(1, 1 + n)
+        self.cols_filtradas = np.arange(1 + n, 1 + 2 * n)
 
         self.fs = 200  # Frecuencia de muestreo en Hz
         self.f0 = 50   # Frecuencia de la red eléctrica (Notch)
         self.Q = 30    # Factor de calidad del filtro notch
-        self.b_notch, self.a_notch = iirnotch(self.f0, self.Q, self.fs)
+        self.sos_notch = diseno_notch(self.fs, self.f0, self.Q)
 
-        self.timestamps = deque()
-        self.braquial_vals = deque()
-        self.tibial_vals = deque()
+        # Modo streaming: notch + pasabajo causales con estado, solo se filtran las muestras nuevas
+        self.streaming = streaming
+        sos_streaming = np.vstack([self.sos_notch, diseno_pasabajo(self.fs, 20)])
+        self.filtros = [FiltroStreaming(sos_streaming) for _ in self.canales]
+
+        # Muestras de la medición en curso (t, crudas y filtradas) en un buffer circular
+        # preasignado; lo que no entra se pasa a un archivo temporal para refiltrar_fase_cero
+        self.muestras = BufferCircular(capacidad, 1 + 2 * n, desborde=True)
+        self.segundos_dibujados = 10  # durante la medición solo se redibuja lo último
         self.start_time = None
 
+        # Señal completa (t, canal 1, canal 2, ...) que se dibuja decimada según el rango visible
+        self.senal_completa = None
+        self.metodo_decimacion = "minmax"
+        self._actualizando_lod = False
+
         self.plot_widget = PlotWidget()
         self.plot_widget.setBackground('w')
         self.plot_widget.setTitle("Señales en tiempo real")
@@ -28,8 +52,11 @@ class RealTimeGraph(QWidget):
         self.plot_widget.showGrid(x=True, y=True)
         self.plot_widget.setMouseEnabled(x=True, y=False)
 
-        self.curve_braquial = self.plot_widget.plot(pen=mkPen(color='r', width=2), name="Braquial")
-        self.curve_tibial = self.plot_widget.plot(pen=mkPen(color='b', width=2), name="Tibial")
+        self.curvas = [
+            self.plot_widget.plot(pen=mkPen(color=COLORES[i % len(COLORES)], width=2), name=nombre)
+            for i, nombre in enumerate(self.canales)
+        ]
+        self.plot_widget.getViewBox().sigXRangeChanged.connect(self.actualizar_lod)
 
         layout = QVBoxLayout()
         layout.addWidget(self.plot_widget)
@@ -38,44 +65,65 @@ class RealTimeGraph(QWidget):
     def apply_notch(self, arr):
         if len(arr) < 15:  # mínimo requerido para filtrar sin error
             return arr
-        return filtfilt(self.b_notch, self.a_notch, arr)
+        return sosfiltfilt(self.sos_notch, arr)
 
     def filtro_pasabajo(self, arr, cutoff=20, order=4):
         if len(arr) < (order + 1):  # validación para butter()
             return arr
-        b, a = butter(order, cutoff / (0.5 * self.fs), btype='low')
-        padlen = max(len(b), len(a)) * 3
+        sos = diseno_pasabajo(self.fs, cutoff, order)
+        padlen = 3 * (2 * len(sos) + 1)
         if len(arr) < padlen:
-            return arr  # evitar ValueError en filtfilt
-        return filtfilt(b, a, arr)
+            return arr  # evitar ValueError en sosfiltfilt
+        return sosfiltfilt(sos, arr)
     
     def plot_dual_signal(self, t, signal1, signal2, label1="Braquial", label2="Tibial"):
-        self.clear()  # Método personalizado para limpiar pyqtgraph
+        self.plot_signals(t, signal1, signal2)
+
+    def plot_signals(self, t, *senales):
+        # Dibuja una ventana ya recortada (vistas de los arrays del registro), una señal por canal
+        self.senal_completa = None
+        for curva, senal in zip(self.curvas, senales):
+            curva.setData(t, senal)
+        self.plot_widget.setXRange(t[0], t[-1], padding=0)
         # Aplicar límites fijos si ya fueron calculados
         if hasattr(self, 'y_min') and hasattr(self, 'y_max'):
             self.plot_widget.setYRange(self.y_min, self.y_max)
 
         self.plot_widget.showGrid(x=True, y=True)
 
-    def update_plot(self, timestamp_ms, v_braquial, v_tibial):
+    def update_plot(self, timestamp_ms, *valores):
+        self.update_block([timestamp_ms], *([v] for v in valores))
+
+    def update_block(self, timestamps_ms, *senales):
+        # Agrega un bloque de muestras (una secuencia por canal) y redibuja una sola vez
+        timestamps_ms = np.asarray(timestamps_ms, dtype=float)
+        if timestamps_ms.size == 0:
+            return
+        self.senal_completa = None
         if self.start_time is None:
-            self.start_time = timestamp_ms
+            self.start_time = timestamps_ms[0]
 
-        t = (timestamp_ms - self.start_time) / 1000.0
-        self.timestamps.append(t)
-        self.braquial_vals.append(v_braquial)
-        self.tibial_vals.append(v_tibial)
+        bloque = np.full((len(timestamps_ms), 1 + 2 * len(self.canales)), np.nan)
+        bloque[:, T] = (timestamps_ms - self.start_time) / 1000.0
+        for col, filtro, senal in zip(self.cols_crudas, self.filtros, senales):
+            bloque[:, col] = senal
+            if self.streaming:
+                bloque[:, col + len(self.canales)] = filtro.procesar(senal)
+        self.muestras.agregar(bloque)
+        t = bloque[-1, T]
 
         # Esperar al menos 20 datos antes de filtrar y graficar
-        if len(self.braquial_vals) < 20:
+        if len(self.muestras) < 20:
             return
 
-        arr_t = np.array(self.timestamps)
-        arr_b = self.filtro_pasabajo(self.apply_notch(np.array(self.braquial_vals)))
-        arr_ti = self.filtro_pasabajo(self.apply_notch(np.array(self.tibial_vals)))
-
-        self.curve_braquial.setData(arr_t, arr_b)
-        self.curve_tibial.setData(arr_t, arr_ti)
+        datos = self.muestras.vista()
+        inicio = np.searchsorted(datos[T], t - self.segundos_dibujados)
+        arr_t = datos[T, inicio:]
+        for curva, col in zip(self.curvas, self.cols_crudas):
+            if self.streaming:
+                curva.setData(arr_t, datos[col + len(self.canales), inicio:])
+            else:
+                curva.setData(arr_t, self.filtro_pasabajo(self.apply_notch(datos[col, inicio:])))
 
         # Ventana de visualización: últimos 5 segundos
         if t > 5:
@@ -83,10 +131,42 @@ class RealTimeGraph(QWidget):
         else:
             self.plot_widget.setXRange(0, 5)
 
+    def refiltrar_fase_cero(self):
+        # Al terminar la medición se reemplaza la señal causal por una versión sin desfasaje (filtfilt)
+        if self.muestras.total < 20:
+            return
+        datos = self.muestras.historial()
+        filtradas = [self.filtro_pasabajo(self.apply_notch(datos[col])) for col in self.cols_crudas]
+        self.mostrar_senal_completa(datos[T].copy(), *filtradas)
+
+    def mostrar_senal_completa(self, t, *senales):
+        # Para registros completos: se guarda todo y se dibuja solo lo visible, decimado al ancho del gráfico
+        self.senal_completa = (np.asarray(t),) + tuple(np.asarray(s) for s in senales)
+        self.actualizar_lod()
+
+    def actualizar_lod(self, *args):
+        if self.senal_completa is None or self._actualizando_lod:
+            return
+        t, *senales = self.senal_completa
+        x_min, x_max = self.plot_widget.getViewBox().viewRange()[0]
+        inicio = max(np.searchsorted(t, x_min, side='left') - 1, 0)
+        fin = np.searchsorted(t, x_max, side='right') + 1
+        n_pixeles = max(self.plot_widget.width(), 100)
+
+        self._actualizando_lod = True
+        try:
+            for curva, senal in zip(self.curvas, senales):
+                curva.setData(*decimar(t[inicio:fin], senal[inicio:fin], n_pixeles, self.metodo_decimacion))
+        finally:
+            self._actualizando_lod = False
+
     def clear(self):
-        self.timestamps.clear()
-        self.braquial_vals.clear()
-        self.tibial_vals.clear()
+        self.muestras.limpiar()
+        for filtro, curva in zip(self.filtros, self.curvas):
+            filtro.reiniciar()
+            curva.setData([], [])
         self.start_time = None
-        self.curve_braquial.setData([], [])
-        self.curve_tibial.setData([], [])
+        self.senal_completa = None
+
+    def cerrar(self):
+        self.muestras.cerrar()
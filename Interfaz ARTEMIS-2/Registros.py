@@ -0,0 +1,246 @@
+import os
+import re
+import json
+import struct
+import argparse
+import numpy as np
+from Remuestreo import estimar_reloj
+
+PREFIJO_ARDUINO = "Datos recibidos de Arduino:"
+
+# Línea típica: Datos recibidos de Arduino: {"t":878517,"braquial":2.15,"tibial":1.03}
+# (Conexion_wifi.py la escribe con json.dumps, es decir con espacios después de ':' y ',')
+_NUMERO = rb'\s*(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)\s*'
+_PATRON_MUESTRA = re.compile(
+    re.escape(PREFIJO_ARDUINO.encode()) + rb'\s*\{\s*"t"\s*:' + _NUMERO + rb',\s*"braquial"\s*:' + _NUMERO
+    + rb',\s*"tibial"\s*:' + _NUMERO + rb'\}'
+)
+
+
+def _parsear_bytes(contenido):
+    # Devuelve (array (n, 3) con t, braquial, tibial; cantidad de líneas malformadas)
+    prefijo = PREFIJO_ARDUINO.encode()
+    coincidencias = _PATRON_MUESTRA.findall(contenido)
+    malformadas = contenido.count(prefijo) - len(coincidencias)
+    if malformadas == 0:
+        if not coincidencias:
+            return np.empty((0, 3)), 0
+        try:
+            return np.array(coincidencias).astype(float), 0
+        except ValueError:
+            pass  # algún número que float no acepta: se resuelve línea por línea
+
+    # Camino lento, solo si hay líneas que no respetan el formato habitual
+    # (otro orden de claves, claves extra, JSON cortado...)
+    filas = []
+    malformadas = 0
+    for linea in contenido.splitlines():
+        if prefijo not in linea:
+            continue
+        try:
+            m = _PATRON_MUESTRA.search(linea)
+            if m:
+                filas.append(tuple(float(valor) for valor in m.groups()))
+                continue
+            dato = json.loads(linea.split(prefijo, 1)[1])
+            filas.append((float(dato["t"]), float(dato["braquial"]), float(dato["tibial"])))
+        except Exception:
+            malformadas += 1
+    return np.array(filas).astype(float).reshape(-1, 3), malformadas
+
+
+def leer_registro_txt(path):
+    """
+    Lee en una sola pasada un registro con líneas "Datos recibidos de Arduino: {json}".
+
+    Returns:
+    tuple: (t_ms, braquial, tibial, malformadas), con los arrays de NumPy de las
+    muestras válidas y la cantidad de líneas con el prefijo que no se pudieron leer.
+    """
+    with open(path, 'rb') as archivo:
+        datos, malformadas = _parsear_bytes(archivo.read())
+    return datos[:, 0], datos[:, 1], datos[:, 2], malformadas
+
+
+def lineas_registro_txt(t_ms, braquial, tibial):
+    # Mismo formato de línea que los registros reales (JSON compacto)
+    return "".join(
+        f'{PREFIJO_ARDUINO} {{"t":{t:.0f},"braquial":{b:.6g},"tibial":{ti:.6g}}}\n'
+        for t, b, ti in zip(t_ms, braquial, tibial)
+    )
+
+def guardar_registro_txt(path, t_ms, braquial, tibial):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(lineas_registro_txt(t_ms, braquial, tibial))
+
+
+def iterar_registro_txt(path, bytes_por_bloque=16 * 1024 * 1024):
+    """
+    Versión por bloques de leer_registro_txt para archivos muy grandes: cada
+    iteración devuelve (t_ms, braquial, tibial, malformadas) de un bloque.
+    """
+    resto = b""
+    with open(path, 'rb') as archivo:
+        while True:
+            bloque = archivo.read(bytes_por_bloque)
+            if not bloque:
+                break
+            bloque = resto + bloque
+            corte = bloque.rfind(b"\n") + 1
+            if corte == 0:
+                resto = bloque
+                continue
+            resto = bloque[corte:]
+            datos, malformadas = _parsear_bytes(bloque[:corte])
+            yield datos[:, 0], datos[:, 1], datos[:, 2], malformadas
+    if resto:
+        datos, malformadas = _parsear_bytes(resto)
+        yield datos[:, 0], datos[:, 1], datos[:, 2], malformadas
+
+
+# ==== Formato binario (.art) ====
+# magic (8 bytes) | versión (u32) | largo de la cabecera JSON (u32) | cabecera JSON (UTF-8, con relleno)
+# | bloque de muestras little-endian: t en ms (f8) y un f4 por canal, una fila por muestra.
+# La cantidad de muestras se deduce del tamaño del archivo, así se puede seguir agregando al final.
+MAGIC_BINARIO = b"ARTEMIS\x00"
+VERSION_BINARIO = 1
+_INICIO_CABECERA = struct.Struct("<8sII")
+ESCALA_ADC = 3.3 / 4095.0  # V por cuenta del ADC de 12 bits del ESP32
+
+
+def tipo_muestra_binaria(canales):
+    return np.dtype([("t", "<f8")] + [(nombre, "<f4") for nombre in canales])
+
+def cabecera_binaria(canales, fs=None, escala_adc=ESCALA_ADC, metadatos=None, reserva=0):
+    """
+    Bytes de cabecera del formato .art; los datos empiezan alineados a 16 bytes.
+    `reserva` deja bytes libres para agregar metadatos al cerrar (actualizar_metadatos_binario).
+    """
+    cabecera = json.dumps({
+        "fs": fs,
+        "escala_adc": escala_adc,
+        "canales": list(canales),
+        "metadatos": metadatos or {},
+    }, ensure_ascii=False).encode("utf-8")
+    relleno = reserva + -(_INICIO_CABECERA.size + len(cabecera) + reserva) % 16
+    cabecera += b" " * relleno
+    return _INICIO_CABECERA.pack(MAGIC_BINARIO, VERSION_BINARIO, len(cabecera)) + cabecera
+
+def muestras_binarias(t_ms, senales, canales):
+    # Filas (t, canal_0, canal_1, ...) con el dtype del formato, listas para tobytes()
+    filas = np.empty(len(t_ms), dtype=tipo_muestra_binaria(canales))
+    filas["t"] = t_ms
+    for nombre, senal in zip(canales, senales):
+        filas[nombre] = senal
+    return filas
+
+
+def guardar_registro_binario(path, t_ms, senales, canales=("braquial", "tibial"), fs=None,
+                             escala_adc=ESCALA_ADC, metadatos=None):
+    """
+    Guarda un registro en formato binario .art.
+
+    Parameters:
+    t_ms (array): Tiempos en ms.
+    senales (sequence): Un array por canal, en el mismo orden que `canales`.
+    metadatos (dict): Datos del paciente/sesión que se guardan en la cabecera.
+    """
+    with open(path, 'wb') as f:
+        f.write(cabecera_binaria(canales, fs, escala_adc, metadatos))
+        f.write(muestras_binarias(t_ms, senales, canales).tobytes())
+
+
+def abrir_registro_binario(path):
+    """
+    Abre un registro .art con np.memmap (sin copiar los datos a memoria).
+
+    Returns:
+    tuple: (muestras, cabecera), donde muestras es un array estructurado con el
+    campo "t" (ms) y uno por canal, y cabecera el dict con fs, escala_adc,
+    canales y metadatos.
+    """
+    with open(path, 'rb') as f:
+        inicio = f.read(_INICIO_CABECERA.size)
+        if len(inicio) < _INICIO_CABECERA.size:
+            raise ValueError(f"{path} no es un registro ARTEMIS binario compatible")
+        magic, version, largo = _INICIO_CABECERA.unpack(inicio)
+        if magic != MAGIC_BINARIO or version != VERSION_BINARIO:
+            raise ValueError(f"{path} no es un registro ARTEMIS binario compatible")
+        cabecera = json.loads(f.read(largo).decode("utf-8"))
+
+    tipo = tipo_muestra_binaria(cabecera["canales"])
+    inicio = _INICIO_CABECERA.size + largo
+    n = (os.path.getsize(path) - inicio) // tipo.itemsize
+    if n == 0:
+        return np.empty(0, dtype=tipo), cabecera
+    return np.memmap(path, dtype=tipo, mode='r', offset=inicio, shape=(n,)), cabecera
+
+def actualizar_metadatos_binario(path, **campos):
+    """
+    Agrega campos a los metadatos de un .art ya escrito, reescribiendo la cabecera en
+    su lugar. Lanza ValueError si no entran en el espacio de la cabecera original.
+    """
+    with open(path, 'r+b') as f:
+        magic, version, largo = _INICIO_CABECERA.unpack(f.read(_INICIO_CABECERA.size))
+        if magic != MAGIC_BINARIO or version != VERSION_BINARIO:
+            raise ValueError(f"{path} no es un registro ARTEMIS binario compatible")
+        cabecera = json.loads(f.read(largo).decode("utf-8"))
+        cabecera["metadatos"].update(campos)
+        nueva = json.dumps(cabecera, ensure_ascii=False).encode("utf-8")
+        if len(nueva) > largo:
+            raise ValueError(f"Los metadatos nuevos no entran en la cabecera de {path}")
+        f.seek(_INICIO_CABECERA.size)
+        f.write(nueva + b" " * (largo - len(nueva)))
+
+def leer_registro_binario(path):
+    """
+    Lee un registro .art completo como arrays, con cualquier cantidad de canales.
+
+    Returns:
+    tuple: (t_ms, senales, cabecera), con senales de forma (canales, n) en el orden
+    de cabecera["canales"] (lista para Procesamiento.calcular_vop_multicanal).
+    """
+    muestras, cabecera = abrir_registro_binario(path)
+    senales = np.empty((len(cabecera["canales"]), len(muestras)))
+    for fila, nombre in zip(senales, cabecera["canales"]):
+        fila[:] = muestras[nombre]
+    return np.array(muestras["t"]), senales, cabecera
+
+def leer_registro(path):
+    """
+    Lee un registro braquial-tibial en texto (.txt) o binario (.art), según la extensión.
+
+    Returns:
+    tuple: (t_ms, braquial, tibial, malformadas), como leer_registro_txt. En un .art
+    malformadas es 0; se usan los canales "braquial" y "tibial" o, si no tienen esos
+    nombres, los dos primeros.
+    """
+    if os.path.splitext(path)[1].lower() != ".art":
+        return leer_registro_txt(path)
+    muestras, cabecera = abrir_registro_binario(path)
+    canales = cabecera["canales"]
+    if len(canales) < 2:
+        raise ValueError(f"{path} no tiene los dos canales braquial y tibial")
+    nombres = [nombre if nombre in canales else canales[i] for i, nombre in enumerate(("braquial", "tibial"))]
+    return (np.array(muestras["t"]), np.array(muestras[nombres[0]], dtype=float),
+            np.array(muestras[nombres[1]], dtype=float), 0)
+
+
+def convertir_txt_a_binario(path_txt, path_bin=None, fs=None, metadatos=None):
+    t_ms, braquial, tibial, malformadas = leer_registro_txt(path_txt)
+    if path_bin is None:
+        path_bin = os.path.splitext(path_txt)[0] + ".art"
+    _, fs_estimada = estimar_reloj(t_ms)
+    metadatos = dict(metadatos or {}, origen=os.path.basename(path_txt), lineas_invalidas=malformadas,
+                     fs_estimada=fs_estimada)
+    guardar_registro_binario(path_bin, t_ms, (braquial, tibial), fs=fs, metadatos=metadatos)
+    return path_bin
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte registros de texto al formato binario .art")
+    parser.add_argument("archivos", nargs="+", help="Registros .txt a convertir")
+    parser.add_argument("--fs", type=float, default=None, help="Frecuencia de muestreo a guardar en la cabecera")
+    args = parser.parse_args()
+    for archivo in args.archivos:
+        print(f"{archivo} -> {convertir_txt_a_binario(archivo, fs=args.fs)}")
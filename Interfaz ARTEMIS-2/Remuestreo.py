@@ -0,0 +1,90 @@
+import numpy as np
+
+# Reconstrucción del reloj de muestreo del ESP32. Los timestamps de los registros
+# vienen en ms enteros, con jitter de ±1 ms, ráfagas de muestras con el mismo ms
+# (sobre todo al arrancar) y huecos en los que no se muestreó. El análisis supone
+# una grilla uniforme, así que antes de calcular la VOP se reconstruye el tiempo
+# de cada muestra y se interpola a una grilla de fs conocida.
+
+
+def indices_de_muestra(t_ms):
+    """
+    Número de muestra (desde 0) de cada timestamp, contando los huecos en períodos.
+
+    El período nominal es la mediana de los saltos positivos; cada muestra avanza
+    al menos uno, así las que comparten ms quedan en muestras consecutivas. Una
+    muestra que repitió el ms de la anterior se adelantó un período, así que el
+    salto siguiente (que mide dos) se cuenta uno menos.
+    """
+    t_ms = np.asarray(t_ms, dtype=float)
+    if len(t_ms) < 2:
+        return np.zeros(len(t_ms))
+    saltos = np.diff(t_ms)
+    positivos = saltos[saltos > 0]
+    if len(positivos) == 0:
+        return np.arange(len(t_ms), dtype=float)
+    periodo = np.median(positivos)
+    pasos = np.rint(saltos / periodo)
+    forzados = np.concatenate(([0.0], pasos[:-1] == 0))
+    pasos = np.maximum(pasos - forzados, 1)
+    return np.concatenate(([0.0], np.cumsum(pasos)))
+
+def estimar_reloj(t_ms, indices=None):
+    """
+    Estima el reloj real de muestreo y reconstruye timestamps monótonos.
+
+    Ajusta t = a + k·T por mínimos cuadrados, con k el número de muestra (el de la
+    secuencia de las tramas binarias, si se tiene, o el de indices_de_muestra). Se
+    hace una segunda pasada sin las muestras que se apartan más de un período de la
+    recta (ráfagas y retrasos), que así no sesgan T.
+
+    Parameters:
+    t_ms (array): Timestamps en ms tal como llegaron.
+    indices (array): Opcional, número de muestra de cada timestamp.
+
+    Returns:
+    tuple: (t_reconstruido_ms, fs_estimada), con t_reconstruido estrictamente creciente.
+    """
+    t_ms = np.asarray(t_ms, dtype=float)
+    k = indices_de_muestra(t_ms) if indices is None else np.asarray(indices, dtype=float)
+    if len(t_ms) < 2 or k[-1] == k[0]:
+        return t_ms.copy(), None
+
+    usar = np.ones(len(t_ms), dtype=bool)
+    for _ in range(2):
+        periodo, origen = np.polyfit(k[usar], t_ms[usar], 1)
+        residuo = t_ms - (origen + k * periodo)
+        usar = np.abs(residuo) <= max(periodo, 1.0)
+        if usar.sum() < 2:
+            break
+    return origen + k * periodo, 1000.0 / periodo
+
+def remuestrear(t_ms, senales, fs=None, indices=None, max_hueco_s=0.1):
+    """
+    Pasa un registro a una grilla uniforme, interpolando todos los canales juntos.
+
+    Parameters:
+    senales (array): Una fila por canal, forma (canales, n).
+    fs (float): Frecuencia de la grilla de salida; por defecto, la estimada.
+    max_hueco_s (float): Los huecos más largos no se interpolan: quedan en NaN
+        (calcular_vop descarta esas muestras).
+
+    Returns:
+    tuple: (t_ms, senales, fs_estimada), con t_ms uniforme de paso 1000/fs y
+    senales de forma (canales, len(t_ms)).
+    """
+    senales = np.atleast_2d(np.asarray(senales, dtype=float))
+    t_rec, fs_estimada = estimar_reloj(t_ms, indices)
+    if fs_estimada is None:
+        return t_rec, senales.copy(), None
+    fs = fs_estimada if fs is None else fs
+
+    paso = 1000.0 / fs
+    t_unif = t_rec[0] + np.arange(int((t_rec[-1] - t_rec[0]) // paso) + 1) * paso
+    # Interpolación lineal: muestra anterior y peso de la siguiente, iguales para todos los canales
+    izq = np.clip(np.searchsorted(t_rec, t_unif, side='right') - 1, 0, len(t_rec) - 2)
+    ancho = t_rec[izq + 1] - t_rec[izq]
+    peso = np.clip((t_unif - t_rec[izq]) / ancho, 0.0, 1.0)
+    salida = senales[:, izq] * (1 - peso) + senales[:, izq + 1] * peso
+    salida[:, ancho > max_hueco_s * 1000] = np.nan
+    return t_unif, salida, fs_estimada
@@ -0,0 +1,144 @@
+"""
+Análisis por lotes sin GUI de registros "Datos recibidos de Arduino" (.txt) o binarios (.art).
+
+Ejemplo:
+    python analisis_lote.py Señales/ --manifiesto pacientes.csv --salida resumen.csv --procesos 8
+
+El manifiesto (CSV o JSON) tiene una fila por registro con las columnas
+archivo, altura, sistolica, diastolica y edad; "archivo" puede ser el nombre
+del archivo (nico.txt) o su nombre sin extensión (nico).
+"""
+import os
+import sys
+import csv
+import json
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from Procesamiento import analizar_senales
+from PromedioLatidos import analizar_senales_promediado
+from Registros import leer_registro
+from Remuestreo import remuestrear
+
+CAMPOS_SALIDA = [
+    "archivo", "edad", "altura", "sistolica", "diastolica", "muestras", "lineas_invalidas", "fs_estimada",
+    "vop", "fc", "cavi", "n_ptt", "metodo", "error"
+]
+
+
+def buscar_registros(rutas):
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for extension in ("*.txt", "*.art"):
+                archivos.extend(glob.glob(os.path.join(ruta, extension)))
+        else:
+            archivos.extend(glob.glob(ruta))
+    return sorted(set(archivos))
+
+def leer_manifiesto(path):
+    if path.lower().endswith(".json"):
+        with open(path, 'r', encoding='utf-8') as f:
+            filas = json.load(f)
+        if isinstance(filas, dict):
+            filas = [dict(datos, archivo=nombre) for nombre, datos in filas.items()]
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            filas = list(csv.DictReader(f))
+
+    manifiesto = {}
+    for fila in filas:
+        nombre = os.path.basename(str(fila["archivo"]))
+        manifiesto[nombre] = fila
+        manifiesto[os.path.splitext(nombre)[0]] = fila
+    return manifiesto
+
+def _numero(valor):
+    if valor is None or str(valor).strip() == "":
+        return None
+    return float(valor)
+
+
+def analizar_archivo(tarea):
+    # Se ejecuta en un proceso del pool: tarea = (ruta, datos del paciente, fs, remuestrear, refinamiento, método)
+    ruta, paciente, fs, remuestreo, refinamiento, metodo = tarea
+    resultado = {"archivo": os.path.basename(ruta)}
+    try:
+        altura = _numero(paciente.get("altura"))
+        sistolica = _numero(paciente.get("sistolica"))
+        diastolica = _numero(paciente.get("diastolica"))
+        resultado.update(edad=paciente.get("edad"), altura=altura, sistolica=sistolica, diastolica=diastolica)
+        if altura is None:
+            raise ValueError("falta la altura en el manifiesto")
+
+        t_ms, braquial, tibial, malformadas = leer_registro(ruta)
+        resultado["muestras"] = len(t_ms)
+        resultado["lineas_invalidas"] = malformadas
+        if len(t_ms) == 0:
+            raise ValueError("no se encontraron datos válidos")
+        if remuestreo:
+            t_ms, (braquial, tibial), resultado["fs_estimada"] = remuestrear(t_ms, (braquial, tibial), fs=fs)
+        t = (t_ms - t_ms[0]) / 1000.0
+        analizar = analizar_senales_promediado if metodo == "promedio" else analizar_senales
+        resultado.update(analizar(t, braquial, tibial, altura, fs, sistolica, diastolica, refinamiento))
+    except Exception as e:
+        resultado["error"] = str(e)
+    return resultado
+
+
+def escribir_resumen(path, resultados):
+    if path.lower().endswith(".json"):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CAMPOS_SALIDA, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(resultados)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcula VOP, FC y CAVI para muchos registros en paralelo.")
+    parser.add_argument("rutas", nargs="+", help="Directorios o patrones glob de registros .txt")
+    parser.add_argument("--manifiesto", required=True, help="CSV o JSON con altura, presión y edad por registro")
+    parser.add_argument("--salida", default="resumen.csv", help="Archivo de resumen (.csv o .json)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por núcleo)")
+    parser.add_argument("--fs", type=float, default=200, help="Frecuencia de muestreo usada en el análisis (Hz)")
+    parser.add_argument("--sin-remuestreo", action="store_true",
+                        help="Analizar los timestamps tal como vienen, sin pasarlos a una grilla uniforme de --fs")
+    parser.add_argument("--refinamiento", choices=["ninguno", "parabola", "tangente"], default="parabola",
+                        help="Ubicación sub-muestra de los pies de onda")
+    parser.add_argument("--metodo", choices=["latidos", "promedio"], default="latidos",
+                        help="PTT como mediana de cada latido o medido sobre la plantilla de latidos promediados")
+    args = parser.parse_args(argv)
+
+    archivos = buscar_registros(args.rutas)
+    if not archivos:
+        print("No se encontraron registros.")
+        return 1
+    manifiesto = leer_manifiesto(args.manifiesto)
+
+    tareas = []
+    resultados = []
+    for ruta in archivos:
+        nombre = os.path.basename(ruta)
+        paciente = manifiesto.get(nombre) or manifiesto.get(os.path.splitext(nombre)[0])
+        if paciente is None:
+            resultados.append({"archivo": nombre, "error": "no figura en el manifiesto"})
+        else:
+            refinamiento = None if args.refinamiento == "ninguno" else args.refinamiento
+            tareas.append((ruta, paciente, args.fs, not args.sin_remuestreo, refinamiento, args.metodo))
+
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        chunksize = max(1, len(tareas) // (4 * (args.procesos or os.cpu_count() or 1)))
+        resultados.extend(pool.map(analizar_archivo, tareas, chunksize=chunksize))
+
+    resultados.sort(key=lambda r: r["archivo"])
+    escribir_resumen(args.salida, resultados)
+    errores = sum(1 for r in resultados if r.get("error"))
+    print(f"{len(resultados)} registros analizados ({errores} con error). Resumen en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
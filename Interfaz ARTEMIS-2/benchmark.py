@@ -0,0 +1,173 @@
+"""
+Benchmark de las etapas de Procesamiento sobre los registros de Señales/ y sobre
+registros sintéticos de 1 min, 10 min y 1 h (armados repitiendo un registro real).
+
+Ejemplo:
+    python benchmark.py --salida bench_actual.json
+    python benchmark.py --salida bench_nuevo.json --comparar bench_actual.json
+
+Para cada registro y etapa se guarda el menor tiempo de --repeticiones corridas,
+el pico de memoria (tracemalloc, en una corrida aparte) y las muestras por segundo.
+"""
+import os
+import sys
+import json
+import glob
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import scipy
+from scipy.signal import find_peaks
+from Procesamiento import (
+    lowpass_filter, highpass_filter, normalize, suavizar_senal, preprocesar, refinar_pies, emparejar_pies,
+    calcular_vop_arrays
+)
+from Registros import leer_registro_txt, guardar_registro_txt
+from Remuestreo import remuestrear
+from PromedioLatidos import calcular_ptt_promediado
+
+DURACIONES_SINTETICAS = {"1min": 60, "10min": 600, "1h": 3600}
+
+
+def registro_sintetico(t_ms, braquial, tibial, duracion_s):
+    # Repite el registro base (con los tiempos corridos) hasta cubrir duracion_s
+    paso = float(np.median(np.diff(t_ms))) if len(t_ms) > 1 else 20.0
+    largo = t_ms[-1] - t_ms[0] + paso
+    copias = int(np.ceil(duracion_s * 1000 / largo))
+    desplazamientos = np.repeat(np.arange(copias) * largo, len(t_ms))
+    t = np.tile(t_ms - t_ms[0], copias) + desplazamientos
+    n = np.searchsorted(t, duracion_s * 1000)
+    return t[:n], np.tile(braquial, copias)[:n], np.tile(tibial, copias)[:n]
+
+
+def _etapas(path, t_ms, braquial, tibial, altura_cm, fs):
+    # Cada etapa es una función sin argumentos; las que dependen de otra reciben su salida ya calculada.
+    # Como en leer_y_graficar y analisis_lote, todo lo posterior a remuestrear corre sobre la grilla
+    # uniforme de paso 1/fs, sin las muestras NaN de los huecos
+    crudas = (braquial, tibial)
+    t_unif, (braquial, tibial), _ = remuestrear(t_ms, crudas, fs=fs)
+    validos = np.isfinite(braquial) & np.isfinite(tibial)
+    t = (t_unif[validos] - t_unif[0]) / 1000.0
+    braquial, tibial = braquial[validos], tibial[validos]
+    ba_filt = lowpass_filter(highpass_filter(braquial, fs), fs)
+    an_filt = lowpass_filter(highpass_filter(tibial, fs), fs)
+    ba_grad = np.gradient(suavizar_senal(normalize(ba_filt)), 1 / fs)
+    an_grad = np.gradient(suavizar_senal(normalize(an_filt)), 1 / fs)
+    pies_b, _ = find_peaks(ba_grad, distance=fs * 0.2, prominence=max(0.8 * np.std(ba_grad), 0.15))
+    pies_t, _ = find_peaks(an_grad, distance=fs * 0.2, prominence=max(0.7 * np.std(an_grad), 0.15))
+    return {
+        "lectura": lambda: leer_registro_txt(path),
+        "remuestrear": lambda: remuestrear(t_ms, crudas, fs=fs),
+        "filtros": lambda: (lowpass_filter(highpass_filter(braquial, fs), fs),
+                            lowpass_filter(highpass_filter(tibial, fs), fs)),
+        "gradiente": lambda: np.gradient(suavizar_senal(normalize(ba_filt)), 1 / fs),
+        "preprocesar": lambda: preprocesar(np.vstack((braquial, tibial)), fs),
+        "find_peaks": lambda: find_peaks(ba_grad, distance=fs * 0.2, prominence=max(0.8 * np.std(ba_grad), 0.15)),
+        "refinar_pies": lambda: refinar_pies(ba_filt, ba_grad, pies_b, fs, "tangente"),
+        "emparejar_pies": lambda: emparejar_pies(t[pies_b], t[pies_t]),
+        "calcular_vop": lambda: calcular_vop_arrays(t, braquial, tibial, altura_cm, fs),
+        "ptt_promediado": lambda: calcular_ptt_promediado(t, braquial, tibial, fs),
+    }
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tiempos), pico
+
+def medir_registro(nombre, path, altura_cm, fs, repeticiones):
+    t_ms, braquial, tibial, _ = leer_registro_txt(path)
+    t = (t_ms - t_ms[0]) / 1000.0
+    resultado = {"registro": nombre, "muestras": len(t), "duracion_s": float(t[-1]), "etapas": {}}
+    for etapa, funcion in _etapas(path, t_ms, braquial, tibial, altura_cm, fs).items():
+        tiempo, pico = medir(funcion, repeticiones)
+        resultado["etapas"][etapa] = {
+            "tiempo_s": tiempo,
+            "memoria_pico_mb": pico / 2**20,
+            "muestras_por_s": len(t) / tiempo if tiempo > 0 else None,
+        }
+    return resultado
+
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def imprimir(resultado, anterior=None):
+    print(f"{resultado['registro']} ({resultado['muestras']} muestras, {resultado['duracion_s']:.0f} s)")
+    for etapa, medida in resultado["etapas"].items():
+        linea = (f"  {etapa:15s} {medida['tiempo_s'] * 1000:10.2f} ms  {medida['memoria_pico_mb']:8.1f} MB"
+                 f"  {medida['muestras_por_s'] or 0:14.0f} muestras/s")
+        previa = (anterior or {}).get(etapa)
+        if previa and previa["tiempo_s"] > 0:
+            linea += f"  x{medida['tiempo_s'] / previa['tiempo_s']:.2f} vs. anterior"
+        print(linea)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark por etapas del procesamiento de VOP.")
+    parser.add_argument("--senales", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Señales"),
+                        help="Directorio con los registros reales")
+    parser.add_argument("--base", default="nico.txt", help="Registro que se repite para armar los sintéticos")
+    parser.add_argument("--sinteticos", nargs="*", default=list(DURACIONES_SINTETICAS),
+                        choices=list(DURACIONES_SINTETICAS), help="Duraciones sintéticas a medir")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--altura", type=float, default=170)
+    parser.add_argument("--fs", type=float, default=200)
+    parser.add_argument("--salida", default="benchmark.json", help="Archivo JSON con los resultados")
+    parser.add_argument("--comparar", default=None, help="JSON de una corrida anterior para comparar tiempos")
+    args = parser.parse_args(argv)
+
+    anteriores = {}
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            anteriores = {r["registro"]: r["etapas"] for r in json.load(f)["resultados"]}
+
+    resultados = []
+    for path in sorted(glob.glob(os.path.join(args.senales, "*.txt"))):
+        resultados.append(medir_registro(os.path.basename(path), path, args.altura, args.fs, args.repeticiones))
+        imprimir(resultados[-1], anteriores.get(resultados[-1]["registro"]))
+
+    t_ms, braquial, tibial, _ = leer_registro_txt(os.path.join(args.senales, args.base))
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre in args.sinteticos:
+            path = os.path.join(directorio, f"sintetico_{nombre}.txt")
+            guardar_registro_txt(path, *registro_sintetico(t_ms, braquial, tibial, DURACIONES_SINTETICAS[nombre]))
+            resultados.append(medir_registro(f"sintetico_{nombre}", path, args.altura, args.fs, args.repeticiones))
+            imprimir(resultados[-1], anteriores.get(resultados[-1]["registro"]))
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor(),
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,12 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from MainWindow import MainWindow  
 
 def main():
+    # Necesario para el pool de procesos del análisis en el ejecutable empaquetado (Windows)
+    multiprocessing.freeze_support()
+
     # Configuración inicial de la aplicación
     app = QApplication(sys.argv)
     